@@ -0,0 +1,51 @@
+"""
+Compare `lex_argsort` and `sort_df_lexicographically` with `np.lexsort` and `DataFrame.sort_values`.
+
+Usage: python benchmarks/lex_argsort.py [rows_cnt]
+"""
+
+import sys
+import time
+
+import numba
+import numpy as np
+import pandas as pd
+from pandas_ops.sortedness import lex_argsort, sort_df_lexicographically
+
+
+def timeit(foo):
+    start = time.perf_counter()
+    foo()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows_cnt = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000_000
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(
+        {
+            "frame": rng.integers(0, 50_000, size=rows_cnt).astype(np.uint32),
+            "scan": rng.integers(0, 1_000, size=rows_cnt).astype(np.uint32),
+            "mz": rng.uniform(100, 1700, size=rows_cnt),
+            "intensity": rng.integers(0, 10_000, size=rows_cnt).astype(np.uint32),
+        }
+    )
+    lex_argsort(df.frame[:1000], df.scan[:1000])  # compilation
+    lex_argsort(df.frame[:1000], df.mz[:1000])
+    sort_df_lexicographically(df[:1000], by=["frame", "scan"])
+    print(f"{rows_cnt:_} rows, threads {numba.get_num_threads()}")
+    for by in (["frame", "scan"], ["frame", "scan", "mz"]):
+        columns = [df[col].to_numpy() for col in by]
+        print(f"sorting by {by}:")
+        print(
+            f"  np.lexsort:                {timeit(lambda: np.lexsort(columns[::-1])):.2f} s"
+        )
+        print(
+            f"  lex_argsort:               {timeit(lambda: lex_argsort(*columns)):.2f} s"
+        )
+        print(
+            f"  DataFrame.sort_values:     {timeit(lambda: df.sort_values(by, kind='stable')):.2f} s"
+        )
+        print(
+            f"  sort_df_lexicographically: {timeit(lambda: sort_df_lexicographically(df, by)):.2f} s"
+        )
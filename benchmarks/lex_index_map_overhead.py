@@ -0,0 +1,61 @@
+"""
+Per-group overhead of calling a kernel on views of columns through the generated, arity-specialised trampolines of `get_views_evaluator`, versus a loop slicing the columns by hand.
+
+Usage: python benchmarks/lex_index_map_overhead.py [groups_cnt]
+"""
+
+import sys
+import time
+
+import numba
+import numpy as np
+from pandas_ops.lex_ops import (
+    LexicographicIndex,
+    get_views_evaluator,
+    views_parallel_map,
+)
+
+
+@numba.njit
+def first_of_first(xx, *args):
+    return xx[0]
+
+
+@numba.njit(parallel=True)
+def hand_sliced_map(outputs, indices, xx, yy, zz):
+    for i in numba.prange(len(indices) - 1):
+        start_idx = indices[i]
+        stop_idx = indices[i + 1]
+        outputs[i] = first_of_first(
+            xx[start_idx:stop_idx], yy[start_idx:stop_idx], zz[start_idx:stop_idx]
+        )
+
+
+def timeit(foo, repeats=5):
+    foo()  # compilation
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        foo()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    groups_cnt = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    rng = np.random.default_rng(42)
+    keys = np.repeat(np.arange(groups_cnt), rng.integers(1, 4, size=groups_cnt))
+    columns = [rng.random(len(keys)) for _ in range(3)]
+    lexidx = LexicographicIndex(keys)
+    outputs = np.empty(len(lexidx), dtype=np.float64)
+    evaluator = get_views_evaluator(len(columns))
+
+    by_hand = timeit(lambda: hand_sliced_map(outputs, lexidx.idx, *columns))
+    trampoline = timeit(
+        lambda: views_parallel_map(
+            outputs, lexidx.idx, evaluator, first_of_first, None, 1, *columns
+        )
+    )
+    print(f"{groups_cnt:_} groups, 3 columns, threads {numba.get_num_threads()}")
+    print(f"sliced by hand:       {1e9 * by_hand / groups_cnt:.2f} ns/group")
+    print(f"generated trampoline: {1e9 * trampoline / groups_cnt:.2f} ns/group")
@@ -0,0 +1,47 @@
+"""
+Compare static and balanced scheduling of LexicographicIndex.map on Zipf-distributed group sizes.
+
+Usage: python benchmarks/lex_index_map_schedule.py [groups_cnt] [zipf_exponent]
+"""
+
+import sys
+import time
+
+import numba
+import numpy as np
+from pandas_ops.lex_ops import LexicographicIndex
+
+
+@numba.njit
+def sorted_median(xx, *args):
+    return np.median(np.sort(xx))
+
+
+def timeit(foo, repeats=3):
+    foo()  # compilation
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        foo()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    groups_cnt = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    zipf_exponent = float(sys.argv[2]) if len(sys.argv) > 2 else 1.5
+    rng = np.random.default_rng(42)
+    sizes = np.minimum(rng.zipf(zipf_exponent, size=groups_cnt), 1_000_000)
+    keys = np.repeat(np.arange(groups_cnt), sizes)
+    values = rng.random(len(keys))
+    lexidx = LexicographicIndex(keys)
+    print(
+        f"{len(keys):_} rows in {groups_cnt:_} groups, biggest {sizes.max():_}, threads {numba.get_num_threads()}"
+    )
+    for name, kwargs in (
+        ("static", dict(schedule="static")),
+        ("balanced", dict(schedule="balanced")),
+        ("balanced, heaviest first", dict(schedule="balanced", heaviest_first=True)),
+    ):
+        seconds = timeit(lambda: lexidx.map(sorted_median, values, **kwargs))
+        print(f"{name:>25}: {seconds:.3f} s")
@@ -1,28 +1,154 @@
+import numba
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
+import pyarrow.compute
+
+from math import inf
+from numba import literal_unroll
+from pandas_ops.stats import KLLSketch
+
+
+@numba.njit
+def is_inside_box(
+    columns: tuple[npt.NDArray, ...], los: npt.NDArray, his: npt.NDArray, i: int
+) -> bool:
+    """Check if the `i`-th row satisfies `los[j] <= columns[j][i] <= his[j]` for all `j`."""
+    j = 0
+    for xx in literal_unroll(columns):
+        if not (xx[i] >= los[j] and xx[i] <= his[j]):
+            return False
+        j += 1
+    return True
+
+
+@numba.njit(parallel=True)
+def box_mask(
+    mask: npt.NDArray, los: npt.NDArray, his: npt.NDArray, *columns: npt.NDArray
+) -> npt.NDArray:
+    """Fill `mask` of rows inside the box in one parallel pass over all columns."""
+    for i in numba.prange(len(mask)):
+        mask[i] = is_inside_box(columns, los, his, i)
+    return mask
+
+
+class BoxFilter:
+    """Filter keeping rows with columns' values within closed intervals.
+
+    Rows with NaNs in filtered columns are dropped, as by `DataFrame.query`.
+
+    Arguments:
+        lo (dict[str, float]|None): Column name to its lowest accepted value.
+        hi (dict[str, float]|None): Column name to its highest accepted value.
+    """
+
+    def __init__(
+        self,
+        lo: dict[str, float] | None = None,
+        hi: dict[str, float] | None = None,
+    ):
+        self.lo = {} if lo is None else dict(lo)
+        self.hi = {} if hi is None else dict(hi)
+
+    @classmethod
+    def from_quantiles(
+        cls,
+        df: pd.DataFrame | dict[str, KLLSketch],
+        min_quantile: float = 0.01,
+        max_quantile: float = 0.99,
+    ) -> "BoxFilter":
+        """Filter columns between their quantiles. See `quantile_filter_query`."""
+        assert 0 <= min_quantile
+        assert min_quantile < max_quantile
+        assert max_quantile <= 1
+        assert len(df) > 0
+
+        lo = {}
+        hi = {}
+        if isinstance(df, dict):
+            for variable, sketch in df.items():
+                lo[variable], hi[variable] = sketch.quantile(
+                    [min_quantile, max_quantile]
+                )
+        else:
+            quantiles = df.quantile([min_quantile, max_quantile])
+            for variable in quantiles.columns:
+                lo[variable], hi[variable] = quantiles[variable]
+        return cls(lo, hi)
+
+    def __repr__(self):
+        return f"BoxFilter(lo={self.lo}, hi={self.hi})"
+
+    def __str__(self):
+        return self.to_query()
+
+    @property
+    def columns(self) -> list[str]:
+        return list(dict.fromkeys([*self.lo, *self.hi]))
+
+    def get_bounds(self, column: str) -> tuple[float, float]:
+        return self.lo.get(column, -inf), self.hi.get(column, inf)
+
+    def _iter_conditions(self):
+        for column in self.columns:
+            if column in self.lo:
+                yield column, ">=", self.lo[column]
+            if column in self.hi:
+                yield column, "<=", self.hi[column]
+
+    def to_query(self) -> str:
+        """Get a string for `DataFrame.query`."""
+        return " and ".join(
+            f"{column} {op} {value}" for column, op, value in self._iter_conditions()
+        )
+
+    def to_duckdb_where(self) -> str:
+        """Get a condition for DuckDB's `WHERE` clause, with quoted column names."""
+        return " AND ".join(
+            f'"{column}" {op} {value}' for column, op, value in self._iter_conditions()
+        )
+
+    def to_pyarrow_expression(self) -> pyarrow.compute.Expression | None:
+        """Get a predicate for `pyarrow.dataset` or the `filters` of `pd.read_parquet`, pushed down to the reader. None if nothing is filtered."""
+        expression = None
+        for column, op, value in self._iter_conditions():
+            field = pyarrow.compute.field(column)
+            condition = field >= value if op == ">=" else field <= value
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def get_mask(self, df: pd.DataFrame | dict[str, npt.NDArray]) -> npt.NDArray:
+        """Get the boolean mask of rows passing the filter, computed by one fused parallel pass over all filtered columns."""
+        columns = self.columns
+        size = len(next(iter(df.values())) if isinstance(df, dict) else df)
+        mask = np.ones(size, dtype=np.bool_)
+        if len(columns) == 0:
+            return mask
+        bounds = np.array([self.get_bounds(column) for column in columns])
+        return box_mask(
+            mask,
+            bounds[:, 0].copy(),
+            bounds[:, 1].copy(),
+            *(np.asarray(df[column]) for column in columns),
+        )
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Get rows of `df` passing the filter, as `df.query(self.to_query())` would."""
+        return df[self.get_mask(df)]
 
 
 def quantile_filter_query(
-    df: pd.DataFrame,
+    df: pd.DataFrame | dict[str, KLLSketch],
     min_quantile: float = 0.01,
     max_quantile: float = 0.99,
 ) -> str:
     """
     Arguments:
-        df (pd.DataFrame): A dataframe for which columns we want the quantile filters to be computed.
+        df (pd.DataFrame|dict[str, KLLSketch]): A dataframe for which columns we want the quantile filters to be computed, or sketches of its columns, e.g. from `stats.sketch_columns`. Quantiles from sketches are off by at most `KLLSketch.rank_error` in rank, with high probability.
         min_quantile (float): Lower value of the quantile.
         max_quantile (float): Upper value of the quantile.
 
     Return:
-        str: A string that can be used to query df or any other data frame to get the limits we want.
+        str: A string that can be used to query df or any other data frame to get the limits we want. Use `BoxFilter.from_quantiles` to apply the filter without parsing the string.
     """
-    assert 0 <= min_quantile
-    assert min_quantile < max_quantile
-    assert max_quantile <= 1
-    assert len(df) > 0
-
-    quantiles = df.quantile([min_quantile, max_quantile]).T.reset_index()
-    quantiles.columns = "variable", "lo", "hi"
-    return " and ".join(
-        f"{r.variable} >= {r.lo} and {r.variable} <= {r.hi}"
-        for r in quantiles.itertuples(index=False)
-    )
+    return BoxFilter.from_quantiles(df, min_quantile, max_quantile).to_query()
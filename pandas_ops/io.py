@@ -1,16 +1,29 @@
+import collections
+import concurrent.futures
 import functools
 import inspect
+import shutil
+import typing
+import urllib.parse
 import warnings
 
 from functools import partial
 from pathlib import Path
 
-import mmappet
-
 import h5py
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 import pandas.errors
+import pyarrow
+import pyarrow.compute
+import pyarrow.dataset
+import pyarrow.feather
+import pyarrow.ipc
+import pyarrow.parquet
 
+from pandas_ops.filters import BoxFilter
+from pandas_ops.iteration import iter_df_batches, iter_start_end_tuples
 from pyarrow import ArrowInvalid
 
 
@@ -26,8 +39,15 @@ def add_kwargs(foo):
     return wrapper
 
 
-def hdf2df(path, group, columns: list[str] | None = None, **kwargs):
+def hdf2df(
+    path,
+    group: str = "/",
+    columns: list[str] | None = None,
+    row_range: tuple[int, int] | None = None,
+    **kwargs,
+):
     data = {}
+    row_slice = slice(None) if row_range is None else slice(*row_range)
     with h5py.File(path) as f:
         if columns is not None:
             for col in columns:
@@ -35,25 +55,196 @@ def hdf2df(path, group, columns: list[str] | None = None, **kwargs):
         else:
             columns = f[group]
         for col in columns:
-            data[col] = f[f"{group}/{col}"][:]
+            data[col] = f[f"{group}/{col}"][row_slice]
     return pd.DataFrame(data)
 
 
+def mmappet2df(
+    path,
+    columns: list[str] | None = None,
+    row_range: tuple[int, int] | None = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Get a DataFrame view of memmaps of a mmappet dataset: neither projection nor slicing copies data."""
+    dct = open_columns(path, columns)
+    if row_range is not None:
+        dct = {col: arr[slice(*row_range)] for col, arr in dct.items()}
+    return pd.DataFrame(dct, copy=False)
+
+
+def get_pyarrow_filter(filters) -> pyarrow.compute.Expression | None:
+    """Turn `filters` of `read_df` into a pyarrow expression.
+
+    Arguments:
+        filters: None, a `filters.BoxFilter`, a pyarrow expression, or a list of `(column, op, value)` tuples (a conjunction) or of lists of them (a disjunction of conjunctions), as in `pd.read_parquet`.
+    """
+    if filters is None or isinstance(filters, pyarrow.compute.Expression):
+        return filters
+    if isinstance(filters, BoxFilter):
+        return filters.to_pyarrow_expression()
+    return pyarrow.parquet.filters_to_expression(filters)
+
+
+def get_filter_columns(filters) -> list[str] | None:
+    """Get columns `filters` of `read_df` refer to, or None if unknown, as for pyarrow expressions."""
+    if filters is None:
+        return []
+    if isinstance(filters, BoxFilter):
+        return filters.columns
+    if isinstance(filters, pyarrow.compute.Expression):
+        return None
+    conjunctions = filters if isinstance(filters[0], list) else [filters]
+    return list(dict.fromkeys(col for conj in conjunctions for col, _, _ in conj))
+
+
+def filter_df(df: pd.DataFrame, filters) -> pd.DataFrame:
+    """Get rows of an in-memory `df` passing `filters` of `read_df`."""
+    if filters is None:
+        return df
+    if isinstance(filters, BoxFilter):
+        return filters.apply(df).reset_index(drop=True)
+    table = pyarrow.Table.from_pandas(df, preserve_index=False)
+    return (
+        pyarrow.dataset.dataset(table)
+        .to_table(filter=get_pyarrow_filter(filters))
+        .to_pandas()
+    )
+
+
+def _get_read_columns(columns, filters) -> list[str] | None:
+    """Columns needed to filter rows after reading them."""
+    filter_columns = get_filter_columns(filters)
+    if columns is None or filter_columns is None:
+        return None
+    return list(dict.fromkeys([*columns, *filter_columns]))
+
+
+def _project(df: pd.DataFrame, columns: list[str] | None) -> pd.DataFrame:
+    if columns is None or list(df.columns) == list(columns):
+        return df
+    for col in columns:
+        if col not in df.columns:
+            raise MissingColumn(f"Missing column `{col}`.")
+    return df[columns]
+
+
+def _get_types_mapper(dtype_backend) -> typing.Callable | None:
+    """Map arrow types onto pandas dtypes as `pd.read_parquet(dtype_backend=...)` does."""
+    if dtype_backend is None or dtype_backend is pd.api.extensions.no_default:
+        return None
+    if dtype_backend == "pyarrow":
+        return pd.ArrowDtype
+    assert (
+        dtype_backend == "numpy_nullable"
+    ), f"Unknown dtype_backend `{dtype_backend}`."
+    return {
+        pyarrow.int8(): pd.Int8Dtype(),
+        pyarrow.int16(): pd.Int16Dtype(),
+        pyarrow.int32(): pd.Int32Dtype(),
+        pyarrow.int64(): pd.Int64Dtype(),
+        pyarrow.uint8(): pd.UInt8Dtype(),
+        pyarrow.uint16(): pd.UInt16Dtype(),
+        pyarrow.uint32(): pd.UInt32Dtype(),
+        pyarrow.uint64(): pd.UInt64Dtype(),
+        pyarrow.bool_(): pd.BooleanDtype(),
+        pyarrow.float32(): pd.Float32Dtype(),
+        pyarrow.float64(): pd.Float64Dtype(),
+        pyarrow.string(): pd.StringDtype(),
+        pyarrow.large_string(): pd.StringDtype(),
+    }.get
+
+
+def _arrow_to_pandas(
+    table: pyarrow.Table,
+    dtype_backend=None,
+    to_pandas_kwargs: dict | None = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Convert an arrow table to pandas honouring options of `pd.read_parquet`."""
+    return table.to_pandas(
+        types_mapper=_get_types_mapper(dtype_backend), **(to_pandas_kwargs or {})
+    )
+
+
+def parquet2df(
+    path,
+    columns: list[str] | None = None,
+    filters=None,
+    row_range: tuple[int, int] | None = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Read a parquet file, pushing projection and filters down to pyarrow and reading only row groups overlapping `row_range`.
+
+    Other keyword arguments are those of `pd.read_parquet`.
+    """
+    if row_range is None:
+        return add_kwargs(pd.read_parquet)(
+            path, columns=columns, filters=get_pyarrow_filter(filters), **kwargs
+        )
+    start, stop = row_range
+    parquet_file = pyarrow.parquet.ParquetFile(path)
+    row_groups = []
+    first_row = None
+    group_start = 0
+    for i in range(parquet_file.metadata.num_row_groups):
+        group_stop = group_start + parquet_file.metadata.row_group(i).num_rows
+        if group_start < stop and start < group_stop:
+            row_groups.append(i)
+            first_row = group_start if first_row is None else first_row
+        group_start = group_stop
+    table = parquet_file.read_row_groups(
+        row_groups, columns=_get_read_columns(columns, filters)
+    )
+    if first_row is not None:
+        table = table.slice(start - first_row, stop - start)
+    return _project(filter_df(_arrow_to_pandas(table, **kwargs), filters), columns)
+
+
+def feather2df(
+    path,
+    columns: list[str] | None = None,
+    filters=None,
+    row_range: tuple[int, int] | None = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Read a feather file, pushing projection and filters down to pyarrow. Rows outside `row_range` are not converted to pandas.
+
+    Other keyword arguments are those of `pd.read_feather`.
+    """
+    if row_range is None and filters is None:
+        return add_kwargs(pd.read_feather)(path, columns=columns, **kwargs)
+    if row_range is None:
+        table = pyarrow.dataset.dataset(path, format="feather").to_table(
+            columns=columns, filter=get_pyarrow_filter(filters)
+        )
+        return _arrow_to_pandas(table, **kwargs)
+    start, stop = row_range
+    table = pyarrow.feather.read_table(
+        path, columns=_get_read_columns(columns, filters), memory_map=True
+    )
+    df = _arrow_to_pandas(table.slice(start, max(stop - start, 0)), **kwargs)
+    return _project(filter_df(df, filters), columns)
+
+
 __ext_to_reader = {
     ".csv": add_kwargs(pd.read_csv),
     ".tsv": add_kwargs(partial(pd.read_csv, sep="\t")),
     ".txt": add_kwargs(partial(pd.read_table)),
     ".xlsx": add_kwargs(pd.read_excel),
     ".json": add_kwargs(pd.read_json),
-    ".feather": add_kwargs(pd.read_feather),
+    ".feather": feather2df,
     ".pandas_hdf": add_kwargs(pd.read_hdf),
     ".hdf": hdf2df,
-    ".parquet": add_kwargs(pd.read_parquet),
-    ".startrek": mmappet.open_dataset,
-    ".mmappet": mmappet.open_dataset,
-    ".cache": mmappet.open_dataset,
+    ".parquet": parquet2df,
+    ".startrek": mmappet2df,
+    ".mmappet": mmappet2df,
+    ".cache": mmappet2df,
 }
 
+# readers handling `filters` and `row_range` themselves; others are filtered and sliced after reading
+__ext_with_pushdown = {".feather", ".parquet"}
+__ext_with_row_range = {".hdf", ".startrek", ".mmappet", ".cache"}
+
 __ext_to_methodName = {
     ".csv": "to_csv",
     ".xlsx": "to_excel",
@@ -71,30 +262,487 @@ class MissingColumn(Exception):
     pass
 
 
-def read_df(file_path: str | Path, *args, **kwargs) -> pd.DataFrame:
+__mmappet_extensions = (".startrek", ".mmappet", ".cache")
+
+
+def open_columns(
+    file_path: str | Path, columns: list[str] | None = None
+) -> dict[str, npt.NDArray]:
+    """Get columns of a table as arrays, memory-mapping them whenever the format allows it.
+
+    For mmappet datasets (.startrek, .mmappet, .cache) nothing is read: slicing the returned memmaps only faults in the touched pages.
+    Other formats are read with `read_df`.
+
+    Arguments:
+        file_path (str|Path): Path to the table.
+        columns (list[str]|None): Columns to open. All by default.
+
+    Returns:
+        dict[str, npt.NDArray]: Column name to array.
+    """
+    if get_extension(file_path) in __mmappet_extensions:
+        import mmappet
+
+        dct = mmappet.open_dataset_dct(file_path)
+        if columns is None:
+            return dct
+        for col in columns:
+            if col not in dct:
+                raise MissingColumn(f"Missing column `{col}`.")
+        return {col: dct[col] for col in columns}
+    df = read_df(file_path, columns=columns)
+    return {col: df[col].to_numpy() for col in df.columns}
+
+
+def read_df(
+    file_path: str | Path,
+    *args,
+    filters=None,
+    row_range: tuple[int, int] | None = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Read a table, possibly only some of its columns and rows.
+
+    Arguments:
+        file_path (str|Path): Path to the table. Its extension determines the reader.
+        *args: Positional arguments of the reader.
+        filters: Keep only rows passing these filters: a `filters.BoxFilter`, a pyarrow expression, or a list of `(column, op, value)` tuples (or a list of lists of them for alternatives) as in `pd.read_parquet`. Pushed down to pyarrow for parquet and feather.
+        row_range (tuple[int, int]|None): Read only rows `start:stop` (before filtering). Sliced while reading for parquet, feather, csv, tsv, hdf5 and mmappet datasets.
+        **kwargs: Keyword arguments of the reader, e.g. `columns`.
+
+    Returns:
+        pd.DataFrame: The table.
+    """
     file_extension = get_extension(file_path)
 
     if "columns" in kwargs and kwargs["columns"] is None:
         del kwargs["columns"]
+    columns = kwargs.get("columns", None)
 
-    if "columns" in kwargs and kwargs["columns"] is not None:
-        if "empty" in kwargs["columns"]:
+    if columns is not None:
+        if "empty" in columns:
             warnings.warn(
                 "Someone uses a column named `empty` in the df. This is a column name reseved for empty dfs."
             )
-        if file_extension in (".tsv", ".csv"):
-            kwargs["usecols"] = kwargs["columns"]
-            del kwargs["columns"]
     try:
         reader = __ext_to_reader[file_extension]
     except KeyError:
         raise ValueError(f"Unsupported file extension: {file_extension}")
+
+    pushdown = file_extension in __ext_with_pushdown
+    if pushdown:
+        kwargs["filters"] = filters
+    elif filters is not None and columns is not None:
+        kwargs["columns"] = _get_read_columns(columns, filters)
+        if kwargs["columns"] is None:
+            del kwargs["columns"]
+    sliced = pushdown or file_extension in __ext_with_row_range
+    if row_range is not None:
+        if sliced:
+            kwargs["row_range"] = row_range
+        elif file_extension in (".tsv", ".csv"):
+            start, stop = row_range
+            kwargs["skiprows"] = range(1, start + 1)
+            kwargs["nrows"] = max(stop - start, 0)
+            sliced = True
+    if file_extension in (".tsv", ".csv") and "columns" in kwargs:
+        kwargs["usecols"] = kwargs["columns"]
+        del kwargs["columns"]
+
     try:
-        return reader(file_path, *args, **kwargs)
+        df = reader(file_path, *args, **kwargs)
     except pandas.errors.EmptyDataError:
         return empty_df
     except ArrowInvalid:
         raise MissingColumn("Missing some of the columns.")
+    if row_range is not None and not sliced:
+        df = df.iloc[slice(*row_range)].reset_index(drop=True)
+    if not pushdown and filters is not None:
+        df = filter_df(df, filters)
+    return _project(df, columns)
+
+
+def count_lines(file_path: str | Path, block_size: int = 1 << 24) -> int:
+    """Count lines of a text file, the last one possibly without a trailing newline, reading it in binary blocks."""
+    lines = 0
+    last = b"\n"
+    with open(file_path, "rb") as f:
+        while block := f.read(block_size):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    return lines + (last != b"\n")
+
+
+def count_rows(file_path: str | Path, *args, **kwargs) -> int:
+    """Count rows of a table reading as little as possible.
+
+    Parquet and feather rows are counted from their footers and metadata, hdf5 ones from dataset shapes, and mmappet ones from sizes of memmaps, without touching data pages.
+    Rows of csv and tsv are lines after the header: quoted fields spanning several lines are not supported.
+    Tables in other formats are read whole.
+
+    Arguments:
+        file_path (str|Path): Path to the table.
+        *args: Positional arguments of `read_df`, e.g. the group of a hdf5 file.
+        **kwargs: Keyword arguments of `read_df`.
+
+    Returns:
+        int: Number of rows.
+    """
+    match get_extension(file_path):
+        case ".parquet":
+            return pyarrow.parquet.ParquetFile(file_path).metadata.num_rows
+        case ".feather":
+            with pyarrow.memory_map(str(file_path)) as source:
+                return pyarrow.ipc.open_file(source).count_rows()
+        case ".hdf":
+            group = args[0] if args else kwargs.get("group", "/")
+            with h5py.File(file_path) as f:
+                return max((len(f[group][col]) for col in f[group]), default=0)
+        case ".csv" | ".tsv":
+            return max(count_lines(file_path) - 1, 0)
+        case ext if ext in __mmappet_extensions:
+            return max(map(len, open_columns(file_path).values()), default=0)
+        case _:
+            return len(read_df(file_path, *args, **kwargs))
+
+
+class LazyTable:
+    """Handle to a table reading metadata upfront and columns only on demand.
+
+    Column names, dtypes and the number of rows come from metadata for parquet, feather, hdf5 and mmappet datasets.
+    A column is read on first access and cached.
+    Tables in other formats are read whole on first need, e.g. of a column or of dtypes. Column names of csv and tsv come from their header.
+    Other attributes of DataFrames, e.g. `query` or `eval`, are those of the table read whole.
+
+    Arguments:
+        file_path (str|Path): Path to the table.
+        *args: Positional arguments of `read_df`, e.g. the group of a hdf5 file.
+        **kwargs: Keyword arguments of `read_df`.
+    """
+
+    column_extensions = (
+        ".parquet",
+        ".feather",
+        ".hdf",
+        ".startrek",
+        ".mmappet",
+        ".cache",
+    )
+
+    def __init__(self, file_path: str | Path, *args, **kwargs):
+        self.file_path = Path(file_path)
+        self.extension = get_extension(file_path)
+        self.args = args
+        self.kwargs = kwargs
+        self._cache = {}
+        self._df = None
+        self._len = None
+        self._dtypes = None
+        if self.extension in self.column_extensions:
+            self._dtypes = self._read_dtypes()
+            self._columns = list(self._dtypes.index)
+        elif self.extension in (".csv", ".tsv"):
+            header = read_df(self.file_path, *self.args, **self.kwargs, nrows=0)
+            self._columns = list(header.columns)
+        else:
+            self._columns = list(self._get_whole_df().columns)
+
+    def _get_hdf_group(self) -> str:
+        return self.args[0] if self.args else self.kwargs.get("group", "/")
+
+    def _get_whole_df(self) -> pd.DataFrame:
+        if self._df is None:
+            self._df = read_df(self.file_path, *self.args, **self.kwargs)
+        return self._df
+
+    def _read_dtypes(self) -> pd.Series:
+        match self.extension:
+            case ".parquet":
+                schema = pyarrow.parquet.read_schema(self.file_path)
+            case ".feather":
+                with pyarrow.memory_map(str(self.file_path)) as source:
+                    schema = pyarrow.ipc.open_file(source).schema
+            case ".hdf":
+                with h5py.File(self.file_path) as f:
+                    group = f[self._get_hdf_group()]
+                    return pd.Series({col: group[col].dtype for col in group})
+            case _:
+                return pd.Series(
+                    {
+                        col: arr.dtype
+                        for col, arr in open_columns(self.file_path).items()
+                    }
+                )
+        return schema.empty_table().to_pandas().dtypes
+
+    @property
+    def dtypes(self) -> pd.Series:
+        if self._dtypes is None:
+            self._dtypes = self._get_whole_df().dtypes
+        return self._dtypes
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._columns)
+
+    def __len__(self) -> int:
+        if self._len is None:
+            if self._df is None and self.extension in (
+                ".parquet",
+                ".feather",
+                ".hdf",
+                ".csv",
+                ".tsv",
+                ".startrek",
+                ".mmappet",
+                ".cache",
+            ):
+                self._len = count_rows(self.file_path, *self.args, **self.kwargs)
+            else:
+                self._len = len(self._get_whole_df())
+        return self._len
+
+    def __repr__(self):
+        return f"LazyTable({str(self.file_path)!r}, columns={self.columns}, loaded={list(self._cache)})"
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._columns
+
+    def __getitem__(self, column: str) -> pd.Series:
+        if column not in self:
+            raise MissingColumn(f"Missing column `{column}`.")
+        if column not in self._cache:
+            if self._df is not None:
+                self._cache[column] = self._df[column]
+            else:
+                self._cache.update(self._read_columns([column]))
+        return self._cache[column]
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self.__dict__.get("_columns", ()):
+            return self[name]
+        if hasattr(pd.DataFrame, name):
+            return getattr(self._get_whole_df(), name)
+        raise AttributeError(name)
+
+    def _read_columns(self, columns: list[str]) -> dict[str, pd.Series]:
+        if self.extension in self.column_extensions:
+            kwargs = {**self.kwargs, "columns": columns}
+            df = read_df(self.file_path, *self.args, **kwargs)
+        else:
+            df = self._get_whole_df()
+        return {col: df[col] for col in columns}
+
+    def to_pandas(self, columns: list[str] | None = None) -> pd.DataFrame:
+        """Get a DataFrame of `columns` (all by default), reading the missing ones in one go and caching them."""
+        columns = self.columns if columns is None else list(columns)
+        for col in columns:
+            if col not in self:
+                raise MissingColumn(f"Missing column `{col}`.")
+        missing = [col for col in columns if col not in self._cache]
+        if missing and self._df is None:
+            self._cache.update(self._read_columns(missing))
+        return pd.DataFrame({col: self[col] for col in columns}, copy=False)
+
+
+def read_table(file_path: str | Path, *args, **kwargs) -> LazyTable:
+    """Open a table lazily: see `LazyTable`."""
+    return LazyTable(file_path, *args, **kwargs)
+
+
+def _read_one(reader: typing.Callable, path, columns, kwargs) -> tuple:
+    try:
+        if columns is not None:
+            kwargs = {**kwargs, "columns": columns}
+        return path, reader(path, **kwargs), None
+    except Exception as error:
+        return path, None, error
+
+
+def read_many(
+    paths: typing.Iterable[str | Path],
+    columns: list[str] | None = None,
+    max_workers: int = 8,
+    ordered: bool = True,
+    max_in_flight: int | None = None,
+    processes: bool = False,
+    reader: typing.Callable = read_df,
+    **kwargs,
+) -> typing.Iterator[tuple[str | Path, typing.Any, Exception | None]]:
+    """Read many files concurrently, holding at most `max_in_flight` results in memory.
+
+    Failing reads do not stop the others: their errors are yielded instead.
+
+    Arguments:
+        paths (Iterable[str|Path]): Paths to read. Consumed lazily.
+        columns (list[str]|None): Columns to read, passed on to `reader` if not None.
+        max_workers (int): Number of threads (or processes) reading files.
+        ordered (bool): Yield results in the order of `paths`. Otherwise, as soon as they are ready.
+        max_in_flight (int|None): Maximal number of files being read or waiting to be yielded. Twice `max_workers` by default.
+        processes (bool): Read in a process pool, for readers holding the GIL. `reader` must then be picklable.
+        reader (Callable): Function reading a path, `read_df` by default. Can be e.g. `count_rows`.
+        **kwargs: Keyword arguments of `reader`.
+
+    Yields:
+        tuple: The path, what `reader` returned (None on failure), and the error raised (None on success).
+    """
+    assert max_workers > 0
+    max_in_flight = 2 * max_workers if max_in_flight is None else max_in_flight
+    assert max_in_flight >= max_workers, "Allow at least one file in flight per worker."
+    executor = (
+        concurrent.futures.ProcessPoolExecutor
+        if processes
+        else concurrent.futures.ThreadPoolExecutor
+    )(max_workers=max_workers)
+    in_flight = collections.deque()
+
+    def get_done():
+        if ordered:
+            return [in_flight.popleft()]
+        done, _ = concurrent.futures.wait(
+            in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        for future in done:
+            in_flight.remove(future)
+        return done
+
+    try:
+        for path in paths:
+            in_flight.append(executor.submit(_read_one, reader, path, columns, kwargs))
+            if len(in_flight) >= max_in_flight:
+                for future in get_done():
+                    yield future.result()
+        while in_flight:
+            for future in get_done():
+                yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_parquet(
+    file_path: str | Path, columns: list[str] | None, batch_rows: int, **kwargs
+) -> typing.Iterator[pd.DataFrame]:
+    parquet_file = pyarrow.parquet.ParquetFile(file_path)
+    for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+def iter_feather(
+    file_path: str | Path, columns: list[str] | None, batch_rows: int, **kwargs
+) -> typing.Iterator[pd.DataFrame]:
+    with pyarrow.memory_map(str(file_path)) as source:
+        reader = pyarrow.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(columns)
+            if batch.num_rows == 0:
+                continue
+            for start, stop in iter_start_end_tuples(batch_rows, batch.num_rows):
+                yield batch.slice(start, stop - start).to_pandas()
+
+
+def iter_csv(
+    file_path: str | Path,
+    columns: list[str] | None,
+    batch_rows: int,
+    sep: str = ",",
+    **kwargs,
+) -> typing.Iterator[pd.DataFrame]:
+    try:
+        with pd.read_csv(
+            file_path, sep=sep, usecols=columns, chunksize=batch_rows, **kwargs
+        ) as reader:
+            for batch in reader:
+                yield batch if columns is None else batch[columns]
+    except pandas.errors.EmptyDataError:
+        return
+
+
+def iter_hdf(
+    file_path: str | Path,
+    columns: list[str] | None,
+    batch_rows: int,
+    group: str = "/",
+    **kwargs,
+) -> typing.Iterator[pd.DataFrame]:
+    with h5py.File(file_path) as f:
+        if columns is None:
+            columns = list(f[group])
+        for col in columns:
+            if col not in f[group]:
+                raise MissingColumn(f"Missing column `{col}`.")
+        datasets = {col: f[group][col] for col in columns}
+        size = len(next(iter(datasets.values()))) if datasets else 0
+        if size == 0:
+            return
+        for start, stop in iter_start_end_tuples(batch_rows, size):
+            yield pd.DataFrame(
+                {col: dataset[start:stop] for col, dataset in datasets.items()}
+            )
+
+
+def iter_mmappet(
+    file_path: str | Path, columns: list[str] | None, batch_rows: int, **kwargs
+) -> typing.Iterator[pd.DataFrame]:
+    dct = open_columns(file_path, columns)
+    size = len(next(iter(dct.values())))
+    if size == 0:
+        return
+    for start, stop in iter_start_end_tuples(batch_rows, size):
+        yield pd.DataFrame(
+            {col: arr[start:stop] for col, arr in dct.items()}, copy=False
+        )
+
+
+__ext_to_batch_iterator = {
+    ".parquet": iter_parquet,
+    ".feather": iter_feather,
+    ".csv": iter_csv,
+    ".tsv": partial(iter_csv, sep="\t"),
+    ".hdf": iter_hdf,
+    ".startrek": iter_mmappet,
+    ".mmappet": iter_mmappet,
+    ".cache": iter_mmappet,
+}
+
+
+def is_streamable(file_path: str | Path) -> bool:
+    """Check if `iter_df` reads the table batch by batch rather than whole."""
+    return get_extension(file_path) in __ext_to_batch_iterator
+
+
+def iter_df(
+    file_path: str | Path,
+    columns: list[str] | None = None,
+    batch_rows: int = 10_000_000,
+    **kwargs,
+) -> typing.Iterator[pd.DataFrame]:
+    """Iterate over consecutive batches of rows of a table, reading only one batch at a time.
+
+    Parquet is read by row groups, feather by record batches, csv and tsv in chunks, hdf5 in hyperslabs of its datasets, and mmappet datasets in windows of memmaps.
+    Other formats are read whole first.
+
+    Arguments:
+        file_path (str|Path): Path to the table.
+        columns (list[str]|None): Columns to read. All by default.
+        batch_rows (int): Maximal number of rows per batch.
+        **kwargs: Extra arguments of the batch iterator, e.g. the `group` of a hdf5 file.
+
+    Yields:
+        pd.DataFrame: Consecutive batches.
+    """
+    file_extension = get_extension(file_path)
+    if file_extension in __ext_to_batch_iterator:
+        yield from __ext_to_batch_iterator[file_extension](
+            file_path, columns, batch_rows, **kwargs
+        )
+    else:
+        yield from iter_df_batches(
+            read_df(file_path, columns=columns, **kwargs), size=batch_rows
+        )
 
 
 def save_df(
@@ -116,6 +764,8 @@ def save_df(
         case ".pandas_hdf":
             dataframe.to_hdf(file_path, key=key, *args, **kwargs)
         case ".startrek":
+            import mmappet
+
             with mmappet.DatasetWriter(path=file_path, **kwargs) as data_writer:
                 data_writer.append_df(dataframe)
         case other:  # this might obviously not work
@@ -126,6 +776,600 @@ def save_df(
                 writer(file_path, *args, **kwargs)
 
 
+def _to_hdf_array(values: pd.Series) -> np.ndarray:
+    """Convert a column into an array h5py can store: strings into objects of a variable-length string dataset, categoricals and nullable numbers into their numpy dtypes."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(values.dtype.categories.dtype)
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype) and dtype != object:
+        return values.to_numpy()
+    if pd.api.types.is_string_dtype(dtype):
+        assert (
+            not values.isna().any()
+        ), f"Cannot write missing strings of `{values.name}` into hdf5."
+        return values.to_numpy(dtype=object)
+    return values.to_numpy(dtype=getattr(dtype, "numpy_dtype", None))
+
+
+class DfWriter:
+    """Write a table chunk by chunk, never holding more than one chunk in memory.
+
+    Parquet is written with `pyarrow.parquet.ParquetWriter`, feather as an Arrow IPC file, csv and tsv as text with one header, hdf5 into resizable datasets of a group, and mmappet datasets with `mmappet.DatasetWriter`.
+    Use as a context manager, or call `close`. If the `with` block raises, the partial output is removed.
+
+    Arguments:
+        file_path (str|Path): Path to the output. Its extension determines the format.
+        schema (pyarrow.Schema|dict|None): Schema of the table, or a mapping of column names to dtypes. Inferred from the first chunk by default. Parquet and feather chunks are cast to it, hdf5 datasets take their dtypes from it, and csv and tsv chunks are written as they come.
+        row_group_rows (int|None): Number of rows per parquet row group, feather record batch, or hdf5 chunk. Appended chunks are buffered up to it. By default, every chunk is written as it comes.
+        compression (str|None): Compression codec, e.g. "zstd" for parquet and feather, or "gzip" for hdf5. The format's default by default.
+        group (str): Group of hdf5 datasets.
+        **kwargs: Extra arguments of the underlying writer.
+    """
+
+    extensions = (
+        ".parquet",
+        ".feather",
+        ".csv",
+        ".tsv",
+        ".hdf",
+        ".startrek",
+        ".mmappet",
+        ".cache",
+    )
+
+    def __init__(
+        self,
+        file_path: str | Path,
+        schema: pyarrow.Schema | dict | None = None,
+        row_group_rows: int | None = None,
+        compression: str | None = None,
+        group: str = "/",
+        **kwargs,
+    ):
+        self.file_path = Path(file_path)
+        self.extension = get_extension(file_path)
+        assert (
+            self.extension in self.extensions
+        ), f"Cannot stream into `{self.extension}`. Choose from {self.extensions}."
+        assert row_group_rows is None or row_group_rows > 0
+        if isinstance(schema, dict):
+            schema = pyarrow.Schema.from_pandas(
+                pd.DataFrame(
+                    {col: pd.Series(dtype=dtype) for col, dtype in schema.items()}
+                ),
+                preserve_index=False,
+            )
+        self.schema = schema
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self.group = group
+        self.kwargs = kwargs
+        self.rows = 0
+        self._buffer = []
+        self._buffered_rows = 0
+        self._writer = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def __repr__(self):
+        return f"DfWriter({str(self.file_path)!r}, rows={self.rows})"
+
+    @classmethod
+    def supports(cls, file_path: str | Path) -> bool:
+        return get_extension(file_path) in cls.extensions
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Append rows of `df`. Columns must match the schema."""
+        assert not self._closed, "Writer already closed."
+        if self.schema is None:
+            self.schema = pyarrow.Schema.from_pandas(df, preserve_index=False)
+        assert (
+            list(df.columns) == self.schema.names
+        ), f"Columns {list(df.columns)} do not match the schema {self.schema.names}."
+        if len(df) == 0:
+            return
+        if self.row_group_rows is None:
+            self._write(df)
+            return
+        self._buffer.append(df)
+        self._buffered_rows += len(df)
+        if self._buffered_rows >= self.row_group_rows:
+            buffered = pd.concat(self._buffer, ignore_index=True)
+            full_rows = len(buffered) - len(buffered) % self.row_group_rows
+            self._write(buffered.iloc[:full_rows])
+            self._buffer = [buffered.iloc[full_rows:]]
+            self._buffered_rows = len(buffered) - full_rows
+
+    def _to_table(self, df: pd.DataFrame) -> pyarrow.Table:
+        return pyarrow.Table.from_pandas(
+            df, schema=self.schema, preserve_index=False
+        ).combine_chunks()
+
+    def _write(self, df: pd.DataFrame) -> None:
+        match self.extension:
+            case ".parquet":
+                if self._writer is None:
+                    self._writer = pyarrow.parquet.ParquetWriter(
+                        self.file_path,
+                        self.schema,
+                        compression=self.compression or "snappy",
+                        **self.kwargs,
+                    )
+                self._writer.write_table(
+                    self._to_table(df), row_group_size=self.row_group_rows
+                )
+            case ".feather":
+                if self._writer is None:
+                    self._writer = pyarrow.ipc.new_file(
+                        str(self.file_path),
+                        self.schema,
+                        options=pyarrow.ipc.IpcWriteOptions(
+                            compression=self.compression or "lz4", **self.kwargs
+                        ),
+                    )
+                self._writer.write_table(
+                    self._to_table(df), max_chunksize=self.row_group_rows
+                )
+            case ".csv" | ".tsv":
+                assert self.compression is None, "Compression of csv is not supported."
+                if self._writer is None:
+                    self._writer = open(self.file_path, "w", newline="")
+                df.to_csv(
+                    self._writer,
+                    sep="\t" if self.extension == ".tsv" else ",",
+                    header=self.rows == 0,
+                    index=False,
+                    **self.kwargs,
+                )
+            case ".hdf":
+                if self._writer is None:
+                    self._writer = h5py.File(self.file_path, "w")
+                    group = self._writer.require_group(self.group)
+                    empty = self.schema.empty_table().to_pandas()
+                    for col in df.columns:
+                        dtype = _to_hdf_array(empty[col]).dtype
+                        group.create_dataset(
+                            col,
+                            shape=(0,),
+                            maxshape=(None,),
+                            dtype=h5py.string_dtype() if dtype == object else dtype,
+                            chunks=(
+                                self.row_group_rows or max(1, min(len(df), 1 << 20)),
+                            ),
+                            compression=self.compression,
+                            **self.kwargs,
+                        )
+                group = self._writer[self.group]
+                for col in df.columns:
+                    dataset = group[col]
+                    dataset.resize((self.rows + len(df),))
+                    dataset[self.rows :] = _to_hdf_array(df[col])
+            case _:
+                if self._writer is None:
+                    import mmappet
+
+                    self._writer = mmappet.DatasetWriter(
+                        path=self.file_path, **self.kwargs
+                    ).__enter__()
+                self._writer.append_df(df)
+        self.rows += len(df)
+
+    def close(self) -> None:
+        """Write buffered rows and finalize the file. A table without rows is written only if its schema is known."""
+        if self._closed:
+            return
+        if self._buffered_rows > 0:
+            self._write(pd.concat(self._buffer, ignore_index=True))
+        self._buffer = []
+        self._buffered_rows = 0
+        if self._writer is None and self.schema is not None:
+            self._write(self.schema.empty_table().to_pandas())
+        if self._writer is not None:
+            if self.extension in (".startrek", ".mmappet", ".cache"):
+                self._writer.__exit__(None, None, None)
+            else:
+                self._writer.close()
+        self._closed = True
+
+    def discard(self) -> None:
+        """Drop buffered rows, close the writer, and remove whatever it has written."""
+        if self._closed:
+            return
+        self._buffer = []
+        self._buffered_rows = 0
+        if self._writer is not None:
+            if self.extension in (".startrek", ".mmappet", ".cache"):
+                self._writer.__exit__(None, None, None)
+            else:
+                self._writer.close()
+            if self.file_path.is_dir():
+                shutil.rmtree(self.file_path)
+            else:
+                self.file_path.unlink(missing_ok=True)
+        self._closed = True
+
+
+class SchemaMismatch(Exception):
+    pass
+
+
+def promote_dtypes(left, right):
+    """Get a dtype holding values of both `left` and `right`.
+
+    Numbers and booleans are promoted as by numpy, datetimes and timedeltas to the finest of their units, and strings of different dtypes become objects.
+    Categoricals get the union of their categories, in order of appearance, and are promoted as their categories when mixed with other dtypes.
+    Other dtypes must be equal.
+
+    Raises:
+        SchemaMismatch: If there is no such dtype.
+    """
+    if left == right:
+        return left
+    left_categorical = isinstance(left, pd.CategoricalDtype)
+    right_categorical = isinstance(right, pd.CategoricalDtype)
+    if left_categorical and right_categorical:
+        return pd.CategoricalDtype(left.categories.append(right.categories).unique())
+    if left_categorical or right_categorical:
+        return promote_dtypes(
+            left.categories.dtype if left_categorical else left,
+            right.categories.dtype if right_categorical else right,
+        )
+    if isinstance(left, np.dtype) and isinstance(right, np.dtype):
+        if (left.kind in "biuf" and right.kind in "biuf") or (
+            left.kind == right.kind and left.kind in "mM"
+        ):
+            return np.result_type(left, right)
+    if (
+        isinstance(left, pd.DatetimeTZDtype)
+        and isinstance(right, pd.DatetimeTZDtype)
+        and str(left.tz) == str(right.tz)
+    ):
+        unit = np.result_type(f"M8[{left.unit}]", f"M8[{right.unit}]")
+        return pd.DatetimeTZDtype(unit=np.datetime_data(unit)[0], tz=left.tz)
+    if pd.api.types.is_string_dtype(left) and pd.api.types.is_string_dtype(right):
+        return np.dtype(object)
+    raise SchemaMismatch(f"Cannot promote {left} and {right} to a common dtype.")
+
+
+def _to_nullable(dtype):
+    """Get a dtype holding missing values too, as `pd.concat` does for columns that some tables lack."""
+    if isinstance(dtype, np.dtype):
+        if dtype.kind in "iu":
+            return np.dtype(np.float64)
+        if dtype.kind == "b":
+            return np.dtype(object)
+    return dtype
+
+
+def _get_missing(dtype: np.dtype):
+    return np.datetime64("NaT") if dtype.kind in "mM" else np.nan
+
+
+def get_concat_dtypes(
+    tables: list[LazyTable], columns: list[str] | str | None = None
+) -> dict[str, typing.Any]:
+    """Check that tables can be stacked vertically and get the dtypes of the result, from metadata only.
+
+    Tables without rows are ignored, unless all are empty.
+
+    Arguments:
+        tables (list[LazyTable]): Tables to stack.
+        columns (list[str]|str|None): Columns to stack. By default, those of the first table, which all others must have too, in any order, and no other. With "union", all columns of all tables, missing values filling those that some tables lack, as in `pd.concat`.
+
+    Returns:
+        dict: Column name to promoted dtype.
+
+    Raises:
+        MissingColumn: If a table lacks some of `columns`.
+        SchemaMismatch: If tables have different columns, or dtypes without a common promotion.
+    """
+    nonempty = [table for table in tables if len(table) > 0] or tables[:1]
+    if len(nonempty) == 0:
+        return {}
+    union = isinstance(columns, str)
+    assert not union or columns == "union", f"Unknown columns `{columns}`."
+    if union:
+        columns = list(
+            dict.fromkeys(col for table in nonempty for col in table.columns)
+        )
+    all_columns = columns is None
+    columns = nonempty[0].columns if all_columns else list(columns)
+    dtypes = {}
+    for table in nonempty:
+        if all_columns and set(table.columns) != set(columns):
+            raise SchemaMismatch(
+                f"`{table.file_path}` has columns {table.columns}, but `{nonempty[0].file_path}` has {columns}."
+            )
+        for col in columns:
+            if col not in table:
+                if union:
+                    continue
+                raise MissingColumn(f"Missing column `{col}` in `{table.file_path}`.")
+            try:
+                dtypes[col] = promote_dtypes(
+                    dtypes.get(col, table.dtypes[col]), table.dtypes[col]
+                )
+            except SchemaMismatch as error:
+                raise SchemaMismatch(
+                    f"Column `{col}` of `{table.file_path}`: {error}"
+                ) from error
+    return {
+        col: (
+            _to_nullable(dtypes[col])
+            if any(col not in table for table in nonempty)
+            else dtypes[col]
+        )
+        for col in columns
+    }
+
+
+def allocate_columns(
+    dtypes: dict[str, typing.Any], rows: int
+) -> dict[str, npt.NDArray]:
+    """Allocate arrays of `rows` for columns of `dtypes`: of the dtype itself if it is a numpy one, of objects otherwise."""
+    return {
+        col: np.empty(rows, dtype=dtype if isinstance(dtype, np.dtype) else object)
+        for col, dtype in dtypes.items()
+    }
+
+
+def columns_to_df(
+    arrays: dict[str, npt.NDArray], dtypes: dict[str, typing.Any]
+) -> pd.DataFrame:
+    """Wrap arrays from `allocate_columns` into a DataFrame, without copying those of numpy dtypes."""
+    return pd.DataFrame(
+        {
+            col: (
+                arr
+                if isinstance(dtypes[col], np.dtype)
+                else pd.array(arr, dtype=dtypes[col])
+            )
+            for col, arr in arrays.items()
+        },
+        copy=False,
+    )
+
+
+def _open_table(file_path: str | Path, **kwargs) -> LazyTable:
+    table = read_table(file_path, **kwargs)
+    len(table)
+    table.dtypes
+    table._cache = {}
+    table._df = None  # tables without metadata are read whole: do not keep them
+    return table
+
+
+def _pop_columns(table: LazyTable, columns: list[str] | None = None) -> pd.DataFrame:
+    if columns is not None:
+        columns = [col for col in columns if col in table]
+    df = table.to_pandas(columns)
+    table._cache = {}
+    table._df = None
+    return df
+
+
+def _get_codes_dtype(categories: pd.Index) -> np.dtype:
+    return np.min_scalar_type(-max(len(categories), 1))
+
+
+def encode_constants(
+    constants: list[dict],
+) -> tuple[dict[str, pd.Index], list[dict[str, int]]]:
+    """Dictionary-encode values of columns constant over rows of each of many tables.
+
+    Arguments:
+        constants (list[dict]): For each table, column name to its value. Tables missing a column get None.
+
+    Returns:
+        tuple: Column name to its categories, i.e. distinct non-missing values in order of appearance, and for each table, column name to the code of its value (-1 for missing).
+    """
+    columns = list(dict.fromkeys(col for row in constants for col in row))
+    categories = {
+        col: pd.Index([row.get(col) for row in constants]).dropna().unique()
+        for col in columns
+    }
+    codes = [
+        {col: int(categories[col].get_indexer([row.get(col)])[0]) for col in columns}
+        for row in constants
+    ]
+    return categories, codes
+
+
+def constant_categorical(code: int, rows: int, categories: pd.Index) -> pd.Categorical:
+    """Get a categorical of `rows` copies of one value, given by its `code` among `categories`, storing only small integer codes."""
+    return pd.Categorical.from_codes(
+        np.full(rows, code, dtype=_get_codes_dtype(categories)), categories=categories
+    )
+
+
+def stores_categoricals(file_path: str | Path) -> bool:
+    """Check if tables saved into `file_path` can hold categorical columns, which hdf5 and mmappet datasets cannot."""
+    return get_extension(file_path) in (".parquet", ".feather", ".csv", ".tsv")
+
+
+def _to_hive_value(value) -> str:
+    if value is None or pd.isna(value):
+        return "__HIVE_DEFAULT_PARTITION__"
+    return urllib.parse.quote(str(value), safe="")
+
+
+def concat_tables(
+    paths: typing.Iterable[str | Path],
+    output: str | Path | None = None,
+    columns: list[str] | str | None = None,
+    constants: list[dict] | None = None,
+    partition_cols: list[str] | None = None,
+    categorical: bool | None = None,
+    errors: str = "raise",
+    max_workers: int = 8,
+    **kwargs,
+) -> pd.DataFrame | None:
+    """Stack tables vertically, holding in memory little more than the result.
+
+    Schemas and row counts are first read from metadata (see `LazyTable`), so that mismatching columns and dtype promotions are caught before any data is read.
+    Tables in formats without metadata, like csv, are read once for their schemas and row counts and dropped, and read again when stacked.
+    Then tables are read concurrently and either copied into slices of pre-allocated columns of the result, or, if `output` can be streamed into (see `DfWriter`), written there in the input order.
+
+    Arguments:
+        paths (Iterable[str|Path]): Paths to the tables.
+        output (str|Path|None): Where to save the result. Returned if None.
+        columns (list[str]|str|None): Columns to stack. All by default, in which case all tables must have the same ones. With "union", all columns of all tables, missing values filling those that some tables lack.
+        constants (list[dict]|None): For each table, values of extra columns constant over its rows, e.g. parsed from its path. Put before the other columns, dictionary-encoded (see `encode_constants`).
+        partition_cols (list[str]|None): Constant columns to partition a parquet `output` by. Each table is then written into its own file of its hive partition directory, with partition values stored only in directory names.
+        categorical (bool|None): Emit constant columns as categoricals. By default, if the result is returned or `output` can store them (see `stores_categoricals`).
+        errors (str): "raise" on tables that cannot be opened, or "skip" them with a warning.
+        max_workers (int): Number of threads reading tables.
+        **kwargs: Keyword arguments of `read_table`.
+
+    Returns:
+        pd.DataFrame|None: The result, if `output` is None.
+    """
+    assert errors in ("raise", "skip"), f"Unknown errors `{errors}`."
+    paths = list(paths)
+    if constants is None:
+        constants = [{} for _ in paths]
+    assert len(constants) == len(
+        paths
+    ), f"Got constants for {len(constants)} tables, but {len(paths)} paths."
+    tables = []
+    opened = []
+    for i, (path, table, error) in enumerate(
+        read_many(paths, max_workers=max_workers, reader=_open_table, **kwargs)
+    ):
+        if error is None:
+            tables.append(table)
+            opened.append(i)
+        elif errors == "skip":
+            warnings.warn(f"Skipping `{path}`: {error}")
+        else:
+            raise error
+    paths = [paths[i] for i in opened]
+    constants = [constants[i] for i in opened]
+    dtypes = get_concat_dtypes(tables, columns)
+    columns = list(dtypes)
+    counts = [len(table) for table in tables]
+    starts = np.cumsum([0, *counts]).tolist()
+
+    categories, codes = encode_constants(constants)
+    constant_columns = list(categories)
+    assert not set(constant_columns) & set(
+        columns
+    ), f"Constant columns {constant_columns} clash with columns of the tables."
+    if categorical is None:
+        categorical = output is None or stores_categoricals(output)
+    constant_dtypes = {
+        col: pd.CategoricalDtype(cats) if categorical else cats.dtype
+        for col, cats in categories.items()
+    }
+
+    def iter_dfs():
+        nonempty = [i for i, cnt in enumerate(counts) if cnt > 0]
+        results = read_many(
+            (tables[i] for i in nonempty),
+            columns=columns,
+            max_workers=max_workers,
+            reader=_pop_columns,
+        )
+        for i, (_, df, error) in zip(nonempty, results):
+            tables[i] = None
+            if error is not None:
+                raise error
+            assert (
+                len(df) == counts[i]
+            ), f"`{paths[i]}` has {len(df)} rows, but its metadata says {counts[i]}."
+            yield i, df
+
+    # categories are data, not metadata: they are gathered while reading
+    categorical_columns = [
+        col for col, dtype in dtypes.items() if isinstance(dtype, pd.CategoricalDtype)
+    ]
+    castable = {
+        col: dtype for col, dtype in dtypes.items() if col not in categorical_columns
+    }
+
+    def add_constants(df, i, skip=()):
+        df = df.reindex(columns=columns).astype(castable)
+        for col in reversed(constant_columns):
+            if col in skip:
+                continue
+            if categorical:
+                values = constant_categorical(codes[i][col], len(df), categories[col])
+            else:
+                values = pd.Series(
+                    constants[i].get(col), index=df.index, dtype=constant_dtypes[col]
+                )
+            df.insert(0, col, values)
+        return df
+
+    if partition_cols:
+        assert (
+            output is not None and get_extension(output) == ".parquet"
+        ), "Only parquet datasets can be partitioned."
+        assert set(partition_cols) <= set(
+            constant_columns
+        ), f"Partition columns {partition_cols} must be among constant columns {constant_columns}."
+        Path(output).mkdir(parents=True, exist_ok=True)
+        for i, df in iter_dfs():
+            directory = Path(output).joinpath(
+                *(
+                    f"{col}={_to_hive_value(constants[i].get(col))}"
+                    for col in partition_cols
+                )
+            )
+            directory.mkdir(parents=True, exist_ok=True)
+            with DfWriter(directory / f"part-{i}.parquet") as writer:
+                writer.append(add_constants(df, i, skip=partition_cols))
+        return None
+
+    if output is not None and DfWriter.supports(output):
+        with DfWriter(output) as writer:
+            for i, df in iter_dfs():
+                writer.append(add_constants(df, i))
+            if writer.rows == 0:
+                all_dtypes = {**constant_dtypes, **dtypes}
+                writer.append(
+                    columns_to_df(allocate_columns(all_dtypes, 0), all_dtypes)
+                )
+        return None
+
+    arrays = allocate_columns(dtypes, starts[-1])
+    constant_codes = {
+        col: np.empty(starts[-1], dtype=_get_codes_dtype(cats))
+        for col, cats in categories.items()
+    }
+    observed = {col: pd.Index([]) for col in categorical_columns}
+    for i, df in iter_dfs():
+        start, stop = starts[i], starts[i + 1]
+        for col, code in codes[i].items():
+            constant_codes[col][start:stop] = code
+        for col in columns:
+            arrays[col][start:stop] = (
+                df[col].to_numpy() if col in df else _get_missing(arrays[col].dtype)
+            )
+        for col in categorical_columns:
+            if col in df:
+                observed[col] = observed[col].append(df[col].cat.categories).unique()
+    for col in categorical_columns:
+        dtypes[col] = pd.CategoricalDtype(observed[col])
+    result = columns_to_df(arrays, dtypes)
+    for position, col in enumerate(constant_columns):
+        values = pd.Categorical.from_codes(
+            constant_codes[col], categories=categories[col]
+        )
+        result.insert(position, col, values if categorical else np.asarray(values))
+    if output is None:
+        return result
+    save_df(result, output)
+
+
 __writer_specific_kwargs = {".tsv": dict(sep="\t")}
 
 
@@ -138,6 +1382,8 @@ def save_df2(
     file_extension = get_extension(file_path)
     match file_extension:
         case ".startrek":
+            import mmappet
+
             with mmappet.DatasetWriter(path=file_path, **kwargs) as data_writer:
                 data_writer.append_df(dataframe)
         case other:
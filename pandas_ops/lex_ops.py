@@ -3,9 +3,13 @@ Implementing indexing functionality for lexicogrpahically sorted data.
 """
 from __future__ import annotations
 
+import functools
+import hashlib
 import inspect
+import json
 import typing
 from math import inf
+from pathlib import Path
 
 from numba_progress import ProgressBar
 
@@ -13,8 +17,11 @@ import numba
 import numpy as np
 import numpy.typing as npt
 import pandas as pd
+from numba import literal_unroll
+from pandas_ops.iteration import iter_start_end_tuples
 from pandas_ops.misc import cast_to_array_if_possible
 from pandas_ops.sortedness import is_strictly_increasing
+from pandas_ops.stats import get_sum_dtype, group_moments, group_reductions
 
 
 @numba.njit(parallel=True)
@@ -41,12 +48,123 @@ def get_change_idxs(idxs):
     return res
 
 
-def get_lex_index(*columns):
-    for i in range(len(columns)):
-        try:
-            columns[i] = columns[i].to_numpy()
-        except AttributeError:
-            pass
+@numba.njit
+def row_differs_from_previous(columns: tuple[npt.NDArray, ...], i: int) -> bool:
+    """Check if the `i`-th row of `columns` differs from the `(i-1)`-th one."""
+    for col in literal_unroll(columns):
+        if col[i] != col[i - 1]:
+            return True
+    return False
+
+
+@numba.njit(parallel=True)
+def count_changes_in_chunks(
+    columns: tuple[npt.NDArray, ...],
+    chunk_ends: npt.NDArray,
+    counts: npt.NDArray,
+    progress_proxy: ProgressBar | None = None,
+    progress_step: int = 1,
+) -> None:
+    """First pass: count the rows starting a new group in each chunk of rows.
+
+    Arguments:
+        columns (tuple): Columns of the same length, each sorted within the previous one.
+        chunk_ends (npt.NDArray): Chunk boundaries: chunk `c` spans `chunk_ends[c]:chunk_ends[c+1]`.
+        counts (npt.NDArray): Output with one entry per chunk.
+        progress_proxy (ProgressBar|None): use external progress proxy.
+        progress_step (int): Step for `progress_proxy.update` per compared row and column, added up once per chunk.
+    """
+    for c in numba.prange(len(chunk_ends) - 1):
+        cnt = 0
+        start = max(chunk_ends[c], 1)
+        for i in range(start, chunk_ends[c + 1]):
+            if row_differs_from_previous(columns, i):
+                cnt += 1
+        counts[c] = cnt
+        if progress_proxy is not None and chunk_ends[c + 1] > start:
+            progress_proxy.update(
+                progress_step * len(columns) * (chunk_ends[c + 1] - start)
+            )
+
+
+@numba.njit(parallel=True)
+def fill_changes_in_chunks(
+    columns: tuple[npt.NDArray, ...],
+    chunk_ends: npt.NDArray,
+    offsets: npt.NDArray,
+    idx: npt.NDArray,
+) -> None:
+    """Second pass: write the rows starting a new group in chunk `c` into `idx[offsets[c]:]`."""
+    for c in numba.prange(len(chunk_ends) - 1):
+        j = offsets[c]
+        for i in range(max(chunk_ends[c], 1), chunk_ends[c + 1]):
+            if row_differs_from_previous(columns, i):
+                idx[j] = i
+                j += 1
+
+
+def get_index_dtype(size: int) -> type:
+    """Get the smallest unsigned dtype able to store offsets up to `size` inclusive."""
+    return np.uint32 if size <= np.iinfo(np.uint32).max else np.uint64
+
+
+def get_chunk_ends(size: int, chunks_cnt: int | None = None) -> npt.NDArray:
+    """Split `range(size)` into `chunks_cnt` nearly equal contiguous chunks."""
+    if chunks_cnt is None:
+        chunks_cnt = 4 * numba.get_num_threads()
+    chunks_cnt = max(1, min(chunks_cnt, size))
+    return np.linspace(0, size, chunks_cnt + 1).astype(np.int64)
+
+
+def get_lex_index(
+    *columns: npt.NDArray,
+    progress_proxy: ProgressBar | None = None,
+    progress_step: int = 1,
+    chunks_cnt: int | None = None,
+    memory_budget: int | None = None,
+) -> npt.NDArray:
+    """Get the starts of groups of equal rows in lexicographically sorted columns.
+
+    Runs in two parallel passes over chunks of rows: the first one counts group starts per chunk, a prefix sum over counts gives each chunk its output offset, and the second pass writes the group starts directly into the index.
+    No row-sized temporary is allocated.
+
+    Arguments:
+        *columns (npt.NDArray): Columns of the same length, possibly of different dtypes.
+        progress_proxy (ProgressBar|None): use external progress proxy.
+        progress_step (int): Step for `progress_proxy.update` per compared row and column, as when columns were compared one by one: a bar of total `len(columns) * (len(columns[0]) - 1) * progress_step` fills up. Updates come once per chunk of rows of the counting pass.
+        chunks_cnt (int|None): Number of chunks of rows to split the work into. Defaults to 4 per thread.
+        memory_budget (int|None): Maximal size of the index in bytes. Checked after the counting pass, before any allocation.
+
+    Returns:
+        npt.NDArray: Group starts followed by the number of rows, as uint32 or uint64 depending on the number of rows.
+    """
+    columns = tuple(map(cast_to_array_if_possible, columns))
+    assert len(columns) > 0, "Provide at least one column."
+    size = len(columns[0])
+    for col in columns:
+        assert len(col) == size, "Columns have different lengths."
+
+    chunk_ends = get_chunk_ends(size, chunks_cnt)
+    counts = np.zeros(len(chunk_ends) - 1, dtype=np.int64)
+    count_changes_in_chunks(columns, chunk_ends, counts, progress_proxy, progress_step)
+
+    dtype = get_index_dtype(size)
+    idx_size = int(counts.sum()) + 1 + (size > 0)
+    if (
+        memory_budget is not None
+        and idx_size * np.dtype(dtype).itemsize > memory_budget
+    ):
+        raise MemoryError(
+            f"Index with {idx_size:_} entries of type {np.dtype(dtype)} exceeds the memory budget of {memory_budget:_} bytes."
+        )
+
+    idx = np.empty(idx_size, dtype=dtype)
+    if size > 0:
+        idx[0] = 0
+    idx[-1] = size
+    offsets = 1 + np.cumsum(counts) - counts  # group starts are written after idx[0]
+    fill_changes_in_chunks(columns, chunk_ends, offsets, idx)
+    return idx
 
 
 @numba.njit(parallel=True)
@@ -64,38 +182,69 @@ def general_parallel_map(
             progress_proxy.update(progress_step)
 
 
-__ARG_NO__ = 7
+@functools.lru_cache(maxsize=None)
+def get_views_evaluator(arity: int) -> numba.core.registry.CPUDispatcher:
+    """Get a trampoline calling `foo` on views of exactly `arity` arrays.
+
+    The source of `eval_on_<arity>_views(start_idx, stop_idx, foo, a0, ..., a<arity-1>)` is generated once per arity and then numba specialises it for each signature of dtypes.
+    There is no limit on the number of arrays and `foo` gets no padding of None arguments.
+    """
+    arrays = "".join(f"a{i}, " for i in range(arity))
+    views = "".join(f"a{i}[start_idx:stop_idx], " for i in range(arity))
+    name = f"eval_on_{arity}_views"
+    namespace = {}
+    exec(
+        f"def {name}(start_idx, stop_idx, foo, {arrays}):\n    return foo({views})\n",
+        namespace,
+    )
+    return numba.njit(namespace[name])
 
 
-@numba.njit
-def eval_on_views(
-    start_idx,
-    stop_idx,
-    foo,
-    a0=None,
-    a1=None,
-    a2=None,
-    a3=None,
-    a4=None,
-    a5=None,
-    a6=None,
+@numba.njit(parallel=True)
+def views_parallel_map(
+    outputs: npt.NDArray,
+    indices: npt.NDArray,
+    evaluator: numba.core.registry.CPUDispatcher,
+    foo: numba.core.registry.CPUDispatcher,
+    progress_proxy: ProgressBar | None = None,
+    progress_step: int = 1,
     *foo_args,
-):
-    """Disgusting workaround to make it possible to run numba on multiple variadic inputs."""
-    return foo(
-        a0[start_idx:stop_idx] if a0 is not None else None,
-        a1[start_idx:stop_idx] if a1 is not None else None,
-        a2[start_idx:stop_idx] if a2 is not None else None,
-        a3[start_idx:stop_idx] if a3 is not None else None,
-        a4[start_idx:stop_idx] if a4 is not None else None,
-        a5[start_idx:stop_idx] if a4 is not None else None,
-        a6[start_idx:stop_idx] if a4 is not None else None,
+) -> None:
+    """Spread of independent tasks unto threads, with `foo` called on views of `foo_args` by `evaluator` from `get_views_evaluator`."""
+    assert (
+        len(outputs) == len(indices) - 1
+    ), "Size of outputs incompatible with expected number of chunks."
+    for i in numba.prange(len(indices) - 1):
+        outputs[i] = evaluator(indices[i], indices[i + 1], foo, *foo_args)
+        if progress_proxy is not None:
+            progress_proxy.update(progress_step)
+
+
+def simple_parallel_map(
+    outputs: npt.NDArray,
+    indices: npt.NDArray,
+    foo: numba.core.registry.CPUDispatcher,
+    progress_proxy: ProgressBar | None = None,
+    progress_step: int = 1,
+    *foo_args,
+) -> None:
+    """Simple spread of independent tasks unto threads.
+
+    `outputs[i]` is set to `foo` called on views `indices[i]:indices[i+1]` of exactly the passed `foo_args`, see `views_parallel_map`.
+    """
+    views_parallel_map(
+        outputs,
+        indices,
+        get_views_evaluator(len(foo_args)),
+        foo,
+        progress_proxy,
+        progress_step,
         *foo_args,
     )
 
 
 @numba.njit(parallel=True)
-def simple_parallel_map(
+def simpler_parallel_map(
     outputs: npt.NDArray,
     indices: npt.NDArray,
     foo: numba.core.registry.CPUDispatcher,
@@ -115,37 +264,108 @@ def simple_parallel_map(
     for i in numba.prange(len(indices) - 1):
         start_idx = indices[i]
         stop_idx = indices[i + 1]
-        outputs[i] = eval_on_views(start_idx, stop_idx, foo, *foo_args)
+        outputs[i] = foo(*foo_args, start_idx, stop_idx)
         if progress_proxy is not None:
             progress_proxy.update(progress_step)
 
 
 @numba.njit(parallel=True)
-def simpler_parallel_map(
+def balanced_parallel_map(
     outputs: npt.NDArray,
     indices: npt.NDArray,
+    order: npt.NDArray,
+    chunk_ends: npt.NDArray,
+    evaluator: numba.core.registry.CPUDispatcher,
     foo: numba.core.registry.CPUDispatcher,
     progress_proxy: ProgressBar | None = None,
     progress_step: int = 1,
     *foo_args,
 ) -> None:
-    """Simple spread of independent tasks unto threads.
+    """Spread of independent tasks unto threads in chunks of groups of similar total size.
 
-    Assumptions on foo:
-        * accepts start_idx and stop_idx as first two args
-        * returns a 1D numpy array.
+    Chunk `c` evaluates `foo` on groups `order[chunk_ends[c]:chunk_ends[c+1]]`.
+    Otherwise the same as `simple_parallel_map`.
     """
     assert (
         len(outputs) == len(indices) - 1
     ), "Size of outputs incompatible with expected number of chunks."
+    for c in numba.prange(len(chunk_ends) - 1):
+        for k in range(chunk_ends[c], chunk_ends[c + 1]):
+            i = order[k]
+            outputs[i] = evaluator(indices[i], indices[i + 1], foo, *foo_args)
+            if progress_proxy is not None:
+                progress_proxy.update(progress_step)
+
+
+@numba.njit(parallel=True)
+def ragged_count_parallel_map(
+    counts: npt.NDArray,
+    indices: npt.NDArray,
+    evaluator: numba.core.registry.CPUDispatcher,
+    foo: numba.core.registry.CPUDispatcher,
+    *foo_args,
+) -> None:
+    """Count pass of `map_ragged`: store the lengths of outputs of `foo` on each group."""
+    assert (
+        len(counts) == len(indices) - 1
+    ), "Size of counts incompatible with expected number of chunks."
     for i in numba.prange(len(indices) - 1):
-        start_idx = indices[i]
-        stop_idx = indices[i + 1]
-        outputs[i] = foo(*foo_args, start_idx, stop_idx)
+        counts[i] = len(evaluator(indices[i], indices[i + 1], foo, *foo_args))
+
+
+@numba.njit(parallel=True)
+def ragged_fill_parallel_map(
+    values: npt.NDArray,
+    offsets: npt.NDArray,
+    indices: npt.NDArray,
+    evaluator: numba.core.registry.CPUDispatcher,
+    foo: numba.core.registry.CPUDispatcher,
+    progress_proxy: ProgressBar | None = None,
+    progress_step: int = 1,
+    *foo_args,
+) -> None:
+    """Fill pass of `map_ragged`: write outputs of `foo` on group `i` into `values[offsets[i]:offsets[i+1]]`."""
+    for i in numba.prange(len(indices) - 1):
+        values[offsets[i] : offsets[i + 1]] = evaluator(
+            indices[i], indices[i + 1], foo, *foo_args
+        )
         if progress_proxy is not None:
             progress_proxy.update(progress_step)
 
 
+def get_balanced_chunks(
+    indices: npt.NDArray,
+    chunks_cnt: int | None = None,
+    heaviest_first: bool = False,
+) -> tuple[npt.NDArray, npt.NDArray]:
+    """Split groups into chunks of roughly equal total number of rows.
+
+    Arguments:
+        indices (npt.NDArray): Group starts followed by the number of rows.
+        chunks_cnt (int|None): Number of chunks. Defaults to 16 per thread.
+        heaviest_first (bool): Order groups by decreasing size, so that the biggest ones are started first.
+
+    Returns:
+        tuple: Order in which groups are processed and ends of chunks in that order.
+    """
+    if chunks_cnt is None:
+        chunks_cnt = 16 * numba.get_num_threads()
+    sizes = np.diff(indices)
+    if heaviest_first:
+        order = np.argsort(-sizes.astype(np.int64), kind="stable")
+        sizes = sizes[order]
+    else:
+        order = np.arange(len(sizes))
+    cumulated_sizes = np.cumsum(sizes)
+    targets = np.linspace(0, cumulated_sizes[-1], chunks_cnt + 1)[1:-1]
+    chunk_ends = np.unique(
+        np.concatenate(
+            ([0], np.searchsorted(cumulated_sizes, targets, side="right"), [len(sizes)])
+        )
+    )
+    return order, chunk_ends
+
+
 def has_varargs(func):
     """Check if any parameter of func is a var-positional (*args) type"""
     for param in inspect.signature(func).parameters.values():
@@ -154,8 +374,120 @@ def has_varargs(func):
     return False
 
 
+def iter_streamed_lex_index(
+    *columns: npt.NDArray,
+    chunk_rows: int = 10_000_000,
+) -> typing.Iterator[npt.NDArray]:
+    """Iterate over consecutive parts of the lexicographic index of columns processed in windows of rows.
+
+    Only one window of rows is touched at a time, so memory-mapped columns are never faulted in whole.
+    The last row of each window is carried over to decide if the next window starts a new group.
+
+    Arguments:
+        *columns (npt.NDArray): Lexicographically sorted columns (e.g. np.memmap) of the same length.
+        chunk_rows (int): Number of rows per window.
+
+    Yields:
+        npt.NDArray: Global group starts in consecutive windows and finally the number of rows, all of the same index dtype.
+    """
+    size = len(columns[0])
+    dtype = get_index_dtype(size)
+    prev_row = None
+    for start, stop in iter_start_end_tuples(chunk_rows, size):
+        window = tuple(np.asarray(col[start:stop]) for col in columns)
+        starts = get_lex_index(*window)[:-1].astype(dtype) + dtype(start)
+        if prev_row is not None and prev_row == tuple(col[0] for col in window):
+            starts = starts[1:]
+        prev_row = tuple(col[-1] for col in window)
+        yield starts
+    yield np.array([size], dtype=dtype)
+
+
+def get_columns_fingerprint(
+    columns: dict[str, npt.NDArray], sample_size: int = 4096
+) -> dict:
+    """Fingerprint columns by their names, dtypes, length and a hash of evenly spaced sampled rows.
+
+    Only the sampled rows are read, so fingerprinting memory-mapped columns is cheap.
+    """
+    names = list(columns)
+    size = len(columns[names[0]]) if names else 0
+    sample = np.unique(
+        np.linspace(0, size - 1, min(size, sample_size)).astype(np.int64)
+    )
+    sample_hash = hashlib.blake2b(digest_size=16)
+    for name in names:
+        sample_hash.update(name.encode())
+        sample_hash.update(np.ascontiguousarray(columns[name][sample]).tobytes())
+    return {
+        "names": names,
+        "dtypes": [np.dtype(columns[name].dtype).str for name in names],
+        "size": size,
+        "sample_hash": sample_hash.hexdigest(),
+    }
+
+
+def write_index(
+    index_path: str | Path,
+    idx_parts: typing.Iterable[npt.NDArray],
+    fingerprint: dict | None = None,
+):
+    """Write consecutive parts of an index into a sidecar folder.
+
+    The folder holds the raw `idx.bin` and `meta.json` describing its dtype, size, and optionally the fingerprint of the indexed columns.
+    `meta.json` is written last, so an interrupted write never leaves a valid-looking index.
+    """
+    index_path = Path(index_path)
+    index_path.mkdir(parents=True, exist_ok=True)
+    (index_path / "meta.json").unlink(missing_ok=True)
+    size = 0
+    dtype = None
+    with open(index_path / "idx.bin", "wb") as f:
+        for part in idx_parts:
+            assert (
+                dtype is None or part.dtype == dtype
+            ), "Index parts of different types."
+            dtype = part.dtype
+            part.tofile(f)
+            size += len(part)
+    with open(index_path / "meta.json", "w") as f:
+        json.dump(
+            {"dtype": np.dtype(dtype).str, "size": size, "fingerprint": fingerprint},
+            f,
+            indent=4,
+        )
+
+
+def read_index_meta(index_path: str | Path) -> dict | None:
+    """Read `meta.json` of a sidecar folder, if present."""
+    try:
+        with open(Path(index_path) / "meta.json", "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def open_index(index_path: str | Path, mmap: bool = True) -> npt.NDArray:
+    """Load the index stored in a sidecar folder written by `write_index`, by default as a read-only memmap."""
+    index_path = Path(index_path)
+    meta = read_index_meta(index_path)
+    assert meta is not None, f"Missing `meta.json` in `{index_path}`."
+    if mmap:
+        return np.memmap(
+            index_path / "idx.bin", dtype=meta["dtype"], mode="r", shape=meta["size"]
+        )
+    return np.fromfile(index_path / "idx.bin", dtype=meta["dtype"], count=meta["size"])
+
+
+def get_sidecar_path(dataset: str | Path, columns: list[str]) -> Path:
+    """Get the default location of the index of `dataset` by `columns`: next to the dataset."""
+    return Path(f"{dataset}.{'.'.join(columns)}.lexidx")
+
+
 NumpyType = typing.TypeVar("NumpyType", bound=np.generic)
 
+AGGREGATE_OPS = ("sum", "mean", "var", "min", "max", "argmax", "count", "first", "last")
+
 
 class LexicographicIndex:
     """
@@ -167,16 +499,135 @@ class LexicographicIndex:
         *columns: npt.NDArray,
         progress_proxy: ProgressBar | None = None,
         progress_step: int = 1,
+        chunks_cnt: int | None = None,
+        memory_budget: int | None = None,
     ):
-        idxs = np.zeros(shape=len(columns[0]), dtype=np.bool_)
-        idxs[0] = True
-        for i in range(len(columns)):
-            get_changes(columns[i], idxs, progress_proxy, progress_step)
-        self.idx = np.array(get_change_idxs(idxs), dtype=np.uint32)
+        """
+        Arguments:
+            *columns (npt.NDArray): Lexicographically sorted columns of the same length.
+            progress_proxy (ProgressBar|None): use external progress proxy.
+            progress_step (int): Step for `progress_proxy.update`.
+            chunks_cnt (int|None): Number of chunks of rows processed in parallel.
+            memory_budget (int|None): Maximal size of the index in bytes.
+        """
+        self.idx = get_lex_index(
+            *columns,
+            progress_proxy=progress_proxy,
+            progress_step=progress_step,
+            chunks_cnt=chunks_cnt,
+            memory_budget=memory_budget,
+        )
         assert len(self.idx) > 0, "Produced an empty index."
         assert len(self.idx) > 1, "No chunks present."
         assert is_strictly_increasing(self.idx), "Index not strictly increasing. ABORT"
 
+    @classmethod
+    def from_idx(cls, idx: npt.NDArray, validate: bool = True) -> LexicographicIndex:
+        """Wrap an already computed index: group starts followed by the number of rows.
+
+        Arguments:
+            idx (npt.NDArray): The index.
+            validate (bool): Check that the index is strictly increasing (a pass over the whole index).
+        """
+        lexidx = cls.__new__(cls)
+        lexidx.idx = idx
+        assert len(lexidx.idx) > 1, "No chunks present."
+        if validate:
+            assert is_strictly_increasing(
+                lexidx.idx
+            ), "Index not strictly increasing. ABORT"
+        return lexidx
+
+    @classmethod
+    def from_dataset(
+        cls,
+        path: str | Path,
+        columns: list[str],
+        chunk_rows: int = 10_000_000,
+        index_path: str | Path | None = None,
+    ) -> LexicographicIndex:
+        """Build the index over columns of a stored table without loading them whole.
+
+        Memory-mapped formats (.startrek/.mmappet) are walked in windows of `chunk_rows` rows.
+
+        Arguments:
+            path (str|Path): Path to the table.
+            columns (list[str]): Names of columns the table is lexicographically sorted by.
+            chunk_rows (int): Number of rows per window.
+            index_path (str|Path|None): If provided, the index is streamed into this sidecar folder (with the fingerprint of the columns) and memory-mapped from it.
+        """
+        from pandas_ops.io import open_columns
+
+        dataset = open_columns(path, columns)
+        return cls._from_columns(dataset, columns, chunk_rows, index_path)
+
+    @classmethod
+    def _from_columns(
+        cls,
+        dataset: dict[str, npt.NDArray],
+        columns: list[str],
+        chunk_rows: int,
+        index_path: str | Path | None,
+    ) -> LexicographicIndex:
+        idx_parts = iter_streamed_lex_index(
+            *(dataset[col] for col in columns), chunk_rows=chunk_rows
+        )
+        if index_path is None:
+            return cls.from_idx(np.concatenate(list(idx_parts)))
+        fingerprint = get_columns_fingerprint({col: dataset[col] for col in columns})
+        write_index(index_path, idx_parts, fingerprint)
+        return cls.load(index_path)
+
+    @classmethod
+    def get_or_build(
+        cls,
+        dataset: str | Path,
+        columns: list[str],
+        chunk_rows: int = 10_000_000,
+        index_path: str | Path | None = None,
+    ) -> LexicographicIndex:
+        """Load the cached index of `dataset` by `columns`, (re)building it if missing or stale.
+
+        The cache is valid if the fingerprint of the columns (names, dtypes, length, sampled hash) did not change. Sidecars saved without a fingerprint are rebuilt.
+
+        Arguments:
+            dataset (str|Path): Path to the table, e.g. .startrek or .parquet.
+            columns (list[str]): Names of columns the table is lexicographically sorted by.
+            chunk_rows (int): Number of rows per window when building the index.
+            index_path (str|Path|None): Sidecar folder. Defaults to `<dataset>.<columns>.lexidx` next to the dataset.
+        """
+        from pandas_ops.io import open_columns
+
+        if index_path is None:
+            index_path = get_sidecar_path(dataset, columns)
+        columns_dct = open_columns(dataset, columns)
+        meta = read_index_meta(index_path)
+        fingerprint = None if meta is None else meta.get("fingerprint")
+        if fingerprint is not None and fingerprint == get_columns_fingerprint(
+            {col: columns_dct[col] for col in columns}
+        ):
+            return cls.load(index_path)
+        return cls._from_columns(columns_dct, columns, chunk_rows, index_path)
+
+    def save(self, path: str | Path, fingerprint: dict | None = None) -> None:
+        """Save the index into a sidecar folder.
+
+        Arguments:
+            path (str|Path): Sidecar folder.
+            fingerprint (dict|None): Fingerprint of the indexed columns, see `get_columns_fingerprint`.
+        """
+        write_index(path, [self.idx], fingerprint)
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True) -> LexicographicIndex:
+        """Load the index saved with `save`.
+
+        Arguments:
+            path (str|Path): Sidecar folder.
+            mmap (bool): Memory-map the index instead of reading it.
+        """
+        return cls.from_idx(open_index(path, mmap=mmap), validate=False)
+
     @classmethod
     def from_df(cls, df: pd.DataFrame, **kwargs) -> LexicographicIndex:
         return cls(*[df[c].to_numpy() for c in df.columns], **kwargs)
@@ -225,12 +676,7 @@ class LexicographicIndex:
         *foo_args,
     ) -> None:
         simple_parallel_map(
-            outputs,
-            self.idx,
-            foo,
-            progress_proxy=progress_proxy,
-            progress_step=progress_step,
-            *foo_args,
+            outputs, self.idx, foo, progress_proxy, progress_step, *foo_args
         )
 
     def map(
@@ -240,21 +686,25 @@ class LexicographicIndex:
         progress_proxy: ProgressBar | None = None,
         progress_step: int = 1,
         do_assertions: bool = True,
+        schedule: str = "static",
+        heaviest_first: bool = False,
+        chunks_cnt: int | None = None,
     ) -> npt.NDArray:
         """
         This function will apply the user defined njit-compiled `foo` to chunks defined by isoquants of the index.
 
+        `foo` is called on views of exactly the passed columns, by a trampoline generated for their number, see `get_views_evaluator`.
+
         Arguments:
             foo: njitted function, must define *args (variadic arguments).
-            *foo_args: a number of positional arguments to the function: columns of the same size assumed.
+            *foo_args: any number of positional arguments to the function: columns of the same size assumed.
             progress_proxy (ProgressBar|None): use external progress proxy.
             progress_step (int): Step for `progress_proxy.update`.
+            schedule (str): "static" splits groups evenly among threads. "balanced" splits them into chunks of roughly equal number of rows, which helps with skewed group sizes.
+            heaviest_first (bool): With "balanced" schedule, process groups from the biggest and hand chunks to threads dynamically.
+            chunks_cnt (int|None): With "balanced" schedule, the number of chunks. Defaults to 16 per thread.
         """
-        # if do_assertions:
-        #     assert (
-        #         len(foo_args) <= __ARG_NO__
-        #     ), f"`foo` accepts at most {__ARG_NO__} positional arguments."
-
+        assert schedule in ("static", "balanced"), f"Unknown schedule `{schedule}`."
         assert has_varargs(foo), "`foo` needs `*args`."
 
         assert len(self.idx) > 1, "No chunks present."
@@ -264,9 +714,10 @@ class LexicographicIndex:
         ), "Only numba jitted functions accepted."
 
         foo_args = tuple(map(cast_to_array_if_possible, foo_args))
+        evaluator = get_views_evaluator(len(foo_args))
 
         # using magic of interpretation for what statically typed advanced languages would do with finger in butt...
-        first_result = eval_on_views(self.idx[0], self.idx[1], foo, *foo_args)
+        first_result = evaluator(self.idx[0], self.idx[1], foo, *foo_args)
 
         if isinstance(first_result, np.ndarray):
             shape = (len(self), *first_result.shape)
@@ -289,14 +740,32 @@ class LexicographicIndex:
 
         outputs = np.empty(dtype=dtype, shape=shape)
 
-        simple_parallel_map(
-            outputs,
-            self.idx,
-            foo,  # foo_args*
-            progress_proxy,
-            progress_step,
-            *foo_args,  # foo_args*
-        )
+        if schedule == "static":
+            views_parallel_map(
+                outputs,
+                self.idx,
+                evaluator,
+                foo,  # foo_args*
+                progress_proxy,
+                progress_step,
+                *foo_args,  # foo_args*
+            )
+        else:
+            order, chunk_ends = get_balanced_chunks(
+                self.idx, chunks_cnt, heaviest_first
+            )
+            with numba.parallel_chunksize(1 if heaviest_first else 0):
+                balanced_parallel_map(
+                    outputs,
+                    self.idx,
+                    order,
+                    chunk_ends,
+                    evaluator,
+                    foo,
+                    progress_proxy,
+                    progress_step,
+                    *foo_args,
+                )
 
         if do_assertions:
             assert np.all(
@@ -305,6 +774,68 @@ class LexicographicIndex:
 
         return outputs
 
+    def map_ragged(
+        self,
+        foo: typing.Callable[..., npt.NDArray],
+        *foo_args: npt.NDArray,
+        counter: typing.Callable[..., int] | None = None,
+        progress_proxy: ProgressBar | None = None,
+        progress_step: int = 1,
+    ) -> tuple[npt.NDArray, npt.NDArray]:
+        """
+        Apply `foo` returning arrays of different lengths for different groups.
+
+        Runs a count pass, allocates all outputs at once, and runs a fill pass writing results of each group directly into its slice.
+        Hence `foo` is evaluated twice per group (and so must be deterministic), unless `counter` provides the counts.
+
+        Arguments:
+            foo: njitted function, must define *args (variadic arguments), returns an array (with any number of rows).
+            *foo_args: a number of positional arguments to the function: columns of the same size assumed.
+            counter: njitted function taking the same arguments as `foo` and returning the number of rows `foo` would return.
+            progress_proxy (ProgressBar|None): use external progress proxy.
+            progress_step (int): Step for `progress_proxy.update`.
+
+        Returns:
+            tuple[npt.NDArray, npt.NDArray]: Flat values and offsets: results of group `i` are `values[offsets[i]:offsets[i+1]]`. If no group returns an empty array, offsets can be wrapped into a new `LexicographicIndex.from_idx(offsets)`.
+        """
+        assert has_varargs(foo), "`foo` needs `*args`."
+        assert len(self.idx) > 1, "No chunks present."
+        assert isinstance(
+            foo, numba.core.registry.CPUDispatcher
+        ), "Only numba jitted functions accepted."
+        foo_args = tuple(map(cast_to_array_if_possible, foo_args))
+        evaluator = get_views_evaluator(len(foo_args))
+
+        first_result = evaluator(self.idx[0], self.idx[1], foo, *foo_args)
+        assert isinstance(
+            first_result, np.ndarray
+        ), f".map_ragged not implemented for functions returning {type(first_result)}."
+
+        counts = np.empty(len(self), dtype=np.int64)
+        if counter is None:
+            ragged_count_parallel_map(counts, self.idx, evaluator, foo, *foo_args)
+        else:
+            views_parallel_map(counts, self.idx, evaluator, counter, None, 1, *foo_args)
+
+        total = int(counts.sum())
+        offsets = np.empty(len(self) + 1, dtype=get_index_dtype(total))
+        offsets[0] = 0
+        np.cumsum(counts, out=offsets[1:])
+        values = np.empty(
+            shape=(total, *first_result.shape[1:]), dtype=first_result.dtype
+        )
+        ragged_fill_parallel_map(
+            values,
+            offsets,
+            self.idx,
+            evaluator,
+            foo,
+            progress_proxy,
+            progress_step,
+            *foo_args,
+        )
+        return values, offsets
+
     def simpler_map(
         self,
         foo: typing.Callable[..., npt.NDArray],
@@ -375,6 +906,123 @@ class LexicographicIndex:
 
         return outputs
 
+    def aggregate(
+        self,
+        values: npt.NDArray | pd.Series | dict[str, npt.NDArray] | pd.DataFrame,
+        weights: npt.NDArray | pd.Series | None = None,
+        ops: typing.Iterable[str] = AGGREGATE_OPS,
+        as_df: bool = True,
+    ) -> pd.DataFrame | dict[str, npt.NDArray]:
+        """Compute per group reductions, all requested ones in one fused parallel pass per column.
+
+        Arguments:
+            values (npt.NDArray|pd.Series|dict|pd.DataFrame): A column or a mapping of column names to columns, sorted as the index.
+            weights (npt.NDArray|pd.Series|None): Weights used by `mean` and `var`.
+            ops (Iterable[str]): Any of `AGGREGATE_OPS`. `argmax` is the row of the first maximum in the whole column; `var` is the (weighted) population variance.
+            as_df (bool): Return a DataFrame instead of a dict of arrays.
+
+        Returns:
+            pd.DataFrame|dict[str, npt.NDArray]: One row per group. Columns are named after ops, prefixed with the column name for mappings of columns.
+        """
+        ops = list(ops)
+        for op in ops:
+            assert (
+                op in AGGREGATE_OPS
+            ), f"Unknown op `{op}`. Choose from {AGGREGATE_OPS}."
+        if isinstance(values, (dict, pd.DataFrame)):
+            named_values = {col: values[col] for col in values}
+            prefix = lambda col: f"{col}_"
+        else:
+            named_values = {"": values}
+            prefix = lambda col: ""
+        weights = (
+            np.empty(0, dtype=np.float64)
+            if weights is None
+            else cast_to_array_if_possible(weights)
+        )
+
+        res = {}
+        for col, xx in named_values.items():
+            xx = cast_to_array_if_possible(xx)
+            assert len(xx) == self.idx[-1], "Values do not match the index."
+            assert len(weights) in (0, len(xx)), "Weights do not match the values."
+            outputs = {
+                op: np.empty(len(self) if op in ops else 0, dtype=dtype)
+                for op, dtype in (
+                    ("sum", get_sum_dtype(xx.dtype)),
+                    ("mean", np.float64),
+                    ("var", np.float64),
+                    ("min", xx.dtype),
+                    ("max", xx.dtype),
+                    ("argmax", self.idx.dtype),
+                )
+            }
+            group_reductions(
+                self.idx,
+                xx,
+                weights,
+                np.zeros(1, dtype=outputs["sum"].dtype)[0],
+                *outputs.values(),
+            )
+            if "first" in ops:
+                outputs["first"] = xx[self.idx[:-1]]
+            if "last" in ops:
+                outputs["last"] = xx[self.idx[1:] - 1]
+            for op in ops:
+                if op == "count":
+                    res.setdefault("count", self.group_sizes())
+                else:
+                    res[prefix(col) + op] = outputs[op]
+        return pd.DataFrame(res, copy=False) if as_df else res
+
+    def moments(
+        self,
+        values: npt.NDArray | pd.Series,
+        weights: npt.NDArray | pd.Series | None = None,
+        higher: bool = False,
+        covariate: npt.NDArray | pd.Series | None = None,
+        as_df: bool = True,
+    ) -> pd.DataFrame | dict[str, npt.NDArray]:
+        """Compute weighted moments of all groups in one parallel pass without per group allocations.
+
+        Arguments:
+            values (npt.NDArray|pd.Series): A column sorted as the index.
+            weights (npt.NDArray|pd.Series|None): Weights of values. Equal by default.
+            higher (bool): Also compute skewness and excess kurtosis.
+            covariate (npt.NDArray|pd.Series|None): A column to compute covariances of values with.
+            as_df (bool): Return a DataFrame instead of a dict of arrays.
+
+        Returns:
+            pd.DataFrame|dict[str, npt.NDArray]: One row per group with columns `weight`, `mean`, `var`, and possibly `skew`, `kurtosis` and `cov`. See `stats.weighted_moments`.
+        """
+        xx = cast_to_array_if_possible(values)
+        assert len(xx) == self.idx[-1], "Values do not match the index."
+        weights, covariate = (
+            (
+                np.empty(0, dtype=np.float64)
+                if arg is None
+                else cast_to_array_if_possible(arg)
+            )
+            for arg in (weights, covariate)
+        )
+        assert len(weights) in (0, len(xx)), "Weights do not match the values."
+        assert len(covariate) in (0, len(xx)), "Covariate does not match the values."
+        computed = {
+            "weight": True,
+            "mean": True,
+            "var": True,
+            "skew": higher,
+            "kurtosis": higher,
+            "cov": len(covariate) > 0,
+        }
+        outputs = {
+            name: np.empty(len(self) if compute else 0, dtype=np.float64)
+            for name, compute in computed.items()
+        }
+        group_moments(self.idx, xx, weights, covariate, *outputs.values())
+        res = {name: outputs[name] for name, compute in computed.items() if compute}
+        return pd.DataFrame(res, copy=False) if as_df else res
+
     def group_sizes(self):
         return np.diff(self.idx)
 
@@ -1,10 +1,14 @@
+import ast
+
+
 def parse_key_equal_value(keyval: str) -> tuple:
-    k, v = keyval.split("=")
+    """Parse `key=value`, evaluating the value as a Python literal (number, bool, None, list, ...) if possible, and keeping it a string otherwise.
+
+    So `a=1,2` gives a tuple, while `a=007` or `a={[]}` stay strings. Quote a value to keep it a string, as in `a='1,2'`.
+    """
+    k, v = keyval.split("=", 1)
     try:
-        v = int(v)
-    except ValueError:
-        try:
-            v = float(v)
-        except ValueError:
-            pass
+        v = ast.literal_eval(v)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        pass
     return (k, v)
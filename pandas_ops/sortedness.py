@@ -1,8 +1,10 @@
 """
 TODO: start using Michal's midia_cpp::argsort for parallelized argsort (numpy sucks here)
+Until then, `lex_argsort` does a parallel LSD radix sort (`parallel_argsort`) on order-preserving uint64 encodings of keys.
 """
 
 import math
+import typing
 
 from math import inf
 
@@ -11,7 +13,9 @@ import numpy as np
 import numpy.typing as npt
 import pandas as pd
 
+from numba import literal_unroll
 from numba_progress import ProgressBar
+from pandas_ops.misc import cast_to_array_if_possible
 from pandas_ops.numba_ops import inputs_series_to_numpy
 
 
@@ -69,7 +73,22 @@ def _count_sorted(xx: npt.NDArray):
 count_sorted = inputs_series_to_numpy(_count_sorted)
 
 
-@numba.njit(boundscheck=True)
+@numba.njit
+def compare_to_previous_row(arrays: tuple[npt.NDArray, ...], i: int) -> int:
+    """Compare lexicographically the `i`-th row of `arrays` to the `(i-1)`-th one.
+
+    Returns:
+        int: 1 if bigger, -1 if smaller, 0 if equal.
+    """
+    for arr in literal_unroll(arrays):
+        if arr[i] > arr[i - 1]:
+            return 1
+        if arr[i] < arr[i - 1]:
+            return -1
+    return 0
+
+
+@numba.njit(parallel=True)
 def _is_sorted_lexicographically(
     strictly: bool,
     progress_proxy: ProgressBar | None,
@@ -81,36 +100,36 @@ def _is_sorted_lexicographically(
     E.g. arrays = (A, B) then A[i][0] > A[i-1][0] or A[i][0] == A[i-1][0] and B[i][0] > B[i-1][0] for strictly increasing or B[i][0] == B[i-1][0] if not.
     Hence, A and B are consecutive dimensions to check.
 
+    Rows are split into blocks checked in parallel, each row against the previous one, so also across block boundaries.
+    A shared flag stops all blocks soon after the first violation is found.
+
     Arguments:
         strictly (bool): Should they be strictly increasing?
-        *arrays (npt.NDArray): Arrays of the same type and length.
+        progress_proxy (ProgressBar|None): Updated once per block.
+        *arrays (npt.NDArray): Arrays of the same length, possibly of different types.
     """
-    for arr in arrays:
-        assert arr.dtype == arrays[0].dtype
-        assert len(arr) == len(arrays[0])
-
-    if progress_proxy is not None:
-        progress_proxy.update(1)
-    if len(arr) == 1:
-        return True
-
-    prev = np.empty(len(arrays), dtype=arr.dtype)
-    for j in range(len(arrays)):
-        prev[j] = arrays[j][0]
-
-    for i in range(1, len(arr)):
-        already_strictly_bigger = False
-        for j in range(len(arrays)):
-            already_strictly_bigger |= arrays[j][i] > prev[j]
-            if not already_strictly_bigger and (
-                arrays[j][i] < prev[j] or strictly and (j == len(arrays) - 1)
-            ):
-                return False
-            prev[j] = arrays[j][i]
+    size = len(arrays[0])
+    for arr in literal_unroll(arrays):
+        assert len(arr) == size
+
+    blocks_cnt = max(1, min(size // 65_536, 4 * numba.get_num_threads()))
+    broken = np.zeros(1, dtype=np.bool_)
+    for b in numba.prange(blocks_cnt):
+        block_start = b * size // blocks_cnt
+        block_stop = (b + 1) * size // blocks_cnt
+        start = max(block_start, 1)
+        while start < block_stop and not broken[0]:
+            stop = min(start + 4096, block_stop)
+            for i in range(start, stop):
+                cmp = compare_to_previous_row(arrays, i)
+                if cmp < 0 or strictly and cmp == 0:
+                    broken[0] = True
+                    break
+            start = stop
         if progress_proxy is not None:
-            progress_proxy.update(1)
+            progress_proxy.update(block_stop - block_start)
 
-    return True
+    return not broken[0]
 
 
 _is_sorted_lexicographically_pd_series_friendly = inputs_series_to_numpy(
@@ -129,7 +148,7 @@ def is_sorted_lexicographically(
     Arrays correspond to columns and we check if rows are sorted, first by first array, within same values groups by second, and so on.
 
     Arguments:
-        *arrays (npt.NDArray|pd.Series): 1D arrays to check. Must be of the same shape.
+        *arrays (npt.NDArray|pd.Series): 1D arrays to check. Must be of the same shape, but not necessarily of the same type.
         strictly (bool): If False, checking if rows defined by column-arrays-entries are non-decreasing. If True, if they are strictly increasing.
         desc (str): Message shown in progressbar.
     """
@@ -222,43 +241,98 @@ def get_intersection_of_sorted_arrays(xx: npt.NDArray, yy: npt.NDArray) -> npt.N
 
 
 @numba.njit(boundscheck=True)
-def find_all_indices_that_break_lexicographic_sortedness(
+def find_indices_that_break_lexicographic_sortedness(
     strictly: bool,
+    max_cnt: int,
     *arrays: npt.NDArray,
-) -> bool:
+) -> list[int]:
     """
-    Check if input arrays considered row-wise are lexicographically sorted.
+    Find rows of input arrays that are not lexicographically bigger than their predecessors.
 
     E.g. arrays = (A, B) then A[i][0] > A[i-1][0] or A[i][0] == A[i-1][0] and B[i][0] > B[i-1][0] for strictly increasing or B[i][0] == B[i-1][0] if not.
     Hence, A and B are consecutive dimensions to check.
 
     Arguments:
         strictly (bool): Should they be strictly increasing?
-        *arrays (npt.NDArray): Arrays of the same type and length.
+        max_cnt (int): Stop after finding that many rows. Negative for no limit.
+        *arrays (npt.NDArray): Arrays of the same length, possibly of different types.
+
+    Returns:
+        list[int]: Indices of breaking rows.
     """
-    for arr in arrays:
-        assert arr.dtype == arrays[0].dtype
-        assert len(arr) == len(arrays[0])
+    size = len(arrays[0])
+    for arr in literal_unroll(arrays):
+        assert len(arr) == size
+
+    breakers = [0 for _ in range(0)]
+    for i in range(1, size):
+        if len(breakers) == max_cnt:
+            break
+        cmp = compare_to_previous_row(arrays, i)
+        if cmp < 0 or strictly and cmp == 0:
+            breakers.append(i)
+    return breakers
 
-    breakers = []
-    if len(arr) == 1:
-        return breakers
 
-    prev = np.empty(len(arrays), dtype=arr.dtype)
-    for j in range(len(arrays)):
-        prev[j] = arrays[j][0]
+@numba.njit(boundscheck=True)
+def find_all_indices_that_break_lexicographic_sortedness(
+    strictly: bool,
+    *arrays: npt.NDArray,
+) -> list[int]:
+    """
+    Find all rows of input arrays that are not lexicographically bigger than their predecessors.
 
-    for i in range(1, len(arr)):
-        already_strictly_bigger = False
-        for j in range(len(arrays)):
-            already_strictly_bigger |= arrays[j][i] > prev[j]
-            if not already_strictly_bigger and (
-                arrays[j][i] < prev[j] or strictly and (j == len(arrays) - 1)
-            ):
-                breakers.append(i)
-            prev[j] = arrays[j][i]
+    Arguments:
+        strictly (bool): Should they be strictly increasing?
+        *arrays (npt.NDArray): Arrays of the same length, possibly of different types.
+    """
+    return find_indices_that_break_lexicographic_sortedness(strictly, -1, *arrays)
 
-    return breakers
+
+def find_breakers_in_batches(
+    batches: typing.Iterable[typing.Sequence[npt.NDArray]],
+    strictly: bool = False,
+    max_cnt: int = 10,
+) -> list[int]:
+    """Check lexicographic sortedness of rows streamed in batches of columns.
+
+    The last row of each batch is carried over and compared with the first row of the next one.
+    Stops at the first batch with violations.
+
+    Arguments:
+        batches (Iterable[Sequence[npt.NDArray]]): Consecutive batches of the same columns.
+        strictly (bool): Should rows be strictly increasing?
+        max_cnt (int): Maximal number of breaking rows to report.
+
+    Returns:
+        list[int]: Global indices of at most `max_cnt` breaking rows of the first batch containing any. Empty if rows are sorted.
+    """
+    prev_row = None
+    offset = 0
+    for arrays in batches:
+        arrays = tuple(map(cast_to_array_if_possible, arrays))
+        if len(arrays[0]) == 0:
+            continue
+        breakers = []
+        if prev_row is not None:
+            boundary = tuple(
+                np.array([prev, arr[0]], dtype=arr.dtype)
+                for prev, arr in zip(prev_row, arrays)
+            )
+            if not _is_sorted_lexicographically(strictly, None, *boundary):
+                breakers.append(offset)
+        if not _is_sorted_lexicographically(strictly, None, *arrays):
+            breakers.extend(
+                offset + i
+                for i in find_indices_that_break_lexicographic_sortedness(
+                    strictly, max_cnt, *arrays
+                )
+            )
+        if breakers:
+            return breakers[:max_cnt]
+        prev_row = tuple(arr[-1] for arr in arrays)
+        offset += len(arrays[0])
+    return []
 
 
 def df_is_lexsorted(df):
@@ -280,3 +354,209 @@ def df_is_lex_increasing(df):
             return False
         prev = curr
     return True
+
+
+@numba.njit(parallel=True)
+def _encode_ints(xx: npt.NDArray, min_x, out: npt.NDArray) -> None:
+    """Order-preserving encoding of integers as offsets from their minimum."""
+    for i in numba.prange(len(xx)):
+        out[i] = np.uint64(xx[i]) - np.uint64(min_x)
+
+
+@numba.njit(parallel=True)
+def _encode_floats(
+    xx: npt.NDArray, bits: npt.NDArray, sign_mask: int, out: npt.NDArray
+) -> None:
+    """Order-preserving encoding of floats' bits: flip negatives, set the sign bit of positives. NaNs go last, -0.0 equals 0.0."""
+    for i in numba.prange(len(xx)):
+        if np.isnan(xx[i]):
+            out[i] = np.uint64(sign_mask) | np.uint64(sign_mask - 1)
+        elif xx[i] == 0:
+            out[i] = np.uint64(sign_mask)
+        elif np.uint64(bits[i]) & np.uint64(sign_mask):
+            out[i] = ~np.uint64(bits[i]) & (
+                np.uint64(sign_mask) | np.uint64(sign_mask - 1)
+            )
+        else:
+            out[i] = np.uint64(bits[i]) | np.uint64(sign_mask)
+
+
+def encode_sort_key(xx: npt.NDArray) -> tuple[npt.NDArray, int]:
+    """Encode values as uint64 keys comparing the same way as the values.
+
+    Arguments:
+        xx (npt.NDArray): Booleans, integers, floats, or anything `pd.factorize` can sort.
+
+    Returns:
+        tuple[npt.NDArray, int]: Keys and the number of their significant bits.
+    """
+    xx = np.asarray(xx)
+    out = np.empty(len(xx), dtype=np.uint64)
+    if len(xx) == 0:
+        return out, 0
+    if xx.dtype.kind in "biu":
+        if xx.dtype.kind == "b":
+            xx = xx.view(np.uint8)
+        min_x = xx.min()
+        _encode_ints(xx, min_x, out)
+        return out, (int(xx.max()) - int(min_x)).bit_length()
+    if xx.dtype.kind == "f" and xx.dtype.itemsize in (4, 8):
+        bits = 8 * xx.dtype.itemsize
+        _encode_floats(xx, xx.view(f"u{xx.dtype.itemsize}"), 1 << (bits - 1), out)
+        return out, bits
+    codes, _ = pd.factorize(xx, sort=True, use_na_sentinel=False)
+    return encode_sort_key(codes)
+
+
+@numba.njit(parallel=True)
+def pack_keys(keys: npt.NDArray, codes: npt.NDArray, bits: int) -> None:
+    """Append `bits` low bits of `codes` to `keys`."""
+    for i in numba.prange(len(keys)):
+        keys[i] = (keys[i] << np.uint64(bits)) | codes[i]
+
+
+@numba.njit(parallel=True)
+def take(xx: npt.NDArray, idxs: npt.NDArray, out: npt.NDArray) -> npt.NDArray:
+    """Parallel `out[:] = xx[idxs]`."""
+    for i in numba.prange(len(idxs)):
+        out[i] = xx[idxs[i]]
+    return out
+
+
+@numba.njit(parallel=True)
+def _radix_pass(
+    keys: npt.NDArray,
+    perm: npt.NDArray,
+    shift: int,
+    digit_bits: int,
+    chunk_ends: npt.NDArray,
+    out_keys: npt.NDArray,
+    out_perm: npt.NDArray,
+) -> None:
+    """One stable pass of LSD radix sort on the digit `(keys >> shift) & (2**digit_bits - 1)`.
+
+    Chunks count their digits in parallel, a prefix sum over (digit, chunk) gives each chunk its output positions, and chunks scatter their rows in parallel.
+    """
+    chunks_cnt = len(chunk_ends) - 1
+    radix = 1 << digit_bits
+    mask = np.uint64(radix - 1)
+    _shift = np.uint64(shift)
+    counts = np.zeros((chunks_cnt, radix), dtype=np.int64)
+    for c in numba.prange(chunks_cnt):
+        for i in range(chunk_ends[c], chunk_ends[c + 1]):
+            counts[c, (keys[i] >> _shift) & mask] += 1
+    offset = 0
+    for d in range(radix):
+        for c in range(chunks_cnt):
+            cnt = counts[c, d]
+            counts[c, d] = offset
+            offset += cnt
+    for c in numba.prange(chunks_cnt):
+        positions = counts[c]
+        for i in range(chunk_ends[c], chunk_ends[c + 1]):
+            d = (keys[i] >> _shift) & mask
+            out_keys[positions[d]] = keys[i]
+            out_perm[positions[d]] = perm[i]
+            positions[d] += 1
+
+
+def parallel_argsort(
+    keys: npt.NDArray,
+    bits: int = 64,
+    perm: npt.NDArray | None = None,
+    digit_bits: int = 11,
+) -> tuple[npt.NDArray, npt.NDArray]:
+    """Stable parallel LSD radix argsort of uint64 keys.
+
+    Arguments:
+        keys (npt.NDArray): uint64 keys to sort.
+        bits (int): Number of significant low bits of keys: higher digits are not sorted on.
+        perm (npt.NDArray|None): Row numbers of keys, carried along. Defaults to `np.arange(len(keys))`.
+        digit_bits (int): Bits sorted on in one pass.
+
+    Returns:
+        tuple[npt.NDArray, npt.NDArray]: Sorted keys and the correspondingly reordered `perm` (the permutation sorting keys by default).
+    """
+    if perm is None:
+        perm = np.arange(len(keys))
+    chunk_ends = np.linspace(
+        0, len(keys), max(1, min(numba.get_num_threads(), len(keys))) + 1
+    ).astype(np.int64)
+    out_keys = np.empty_like(keys)
+    out_perm = np.empty_like(perm)
+    inputs_replaced = False
+    for shift in range(0, bits, digit_bits):
+        _radix_pass(
+            keys,
+            perm,
+            shift,
+            min(digit_bits, bits - shift),
+            chunk_ends,
+            out_keys,
+            out_perm,
+        )
+        if not inputs_replaced:  # do not overwrite inputs
+            keys, out_keys = out_keys, np.empty_like(keys)
+            perm, out_perm = out_perm, np.empty_like(perm)
+            inputs_replaced = True
+        else:
+            keys, out_keys = out_keys, keys
+            perm, out_perm = out_perm, perm
+    return keys, perm
+
+
+def lex_argsort(*columns: npt.NDArray | pd.Series) -> npt.NDArray:
+    """Get the stable permutation sorting rows of columns lexicographically, like `np.lexsort(columns[::-1])`.
+
+    Keys are encoded as order-preserving uint64s and sorted with a parallel LSD radix sort, skipping digits above their significant bits.
+    If the significant bits of all keys sum up to at most 64, they are packed into one key and sorted once.
+    Otherwise they are sorted from the last one to the first one, each time stably.
+
+    Arguments:
+        *columns (npt.NDArray|pd.Series): Columns to sort by, the first one being the most significant.
+
+    Returns:
+        npt.NDArray: Permutation of rows.
+    """
+    columns = [cast_to_array_if_possible(col) for col in columns]
+    assert len(columns) > 0, "Provide at least one column."
+    for col in columns:
+        assert len(col) == len(columns[0]), "Columns have different lengths."
+    encoded = [encode_sort_key(col) for col in columns]
+    total_bits = sum(bits for _, bits in encoded)
+    if total_bits <= 64:
+        keys = encoded[0][0]
+        for codes, bits in encoded[1:]:
+            pack_keys(keys, codes, bits)
+        return parallel_argsort(keys, total_bits)[1]
+    perm = parallel_argsort(*encoded[-1])[1]
+    for codes, bits in encoded[-2::-1]:
+        keys = take(codes, perm, np.empty_like(codes))
+        perm = parallel_argsort(keys, bits, perm)[1]
+    return perm
+
+
+def sort_df_lexicographically(df: pd.DataFrame, by: list[str]) -> pd.DataFrame:
+    """Sort rows of `df` lexicographically by columns `by`.
+
+    Each column is gathered once, in parallel, into the output. Columns of extension dtypes, e.g. categoricals or nullable integers, keep them.
+
+    Arguments:
+        df (pd.DataFrame): Table to sort.
+        by (list[str]): Columns to sort by, the first one being the most significant.
+
+    Returns:
+        pd.DataFrame: Sorted table with a fresh index.
+    """
+    perm = lex_argsort(*(df[col] for col in by))
+    sorted_columns = {}
+    for col in df.columns:
+        if not isinstance(df[col].dtype, np.dtype):  # keep extension dtypes
+            sorted_columns[col] = df[col].array.take(perm)
+            continue
+        xx = df[col].to_numpy()
+        if xx.dtype.kind in "biuf":
+            sorted_columns[col] = take(xx, perm, np.empty_like(xx))
+        else:
+            sorted_columns[col] = xx[perm]
+    return pd.DataFrame(sorted_columns, copy=False)
@@ -1,8 +1,11 @@
+import typing
+
 import numba
 import numpy as np
 import numpy.typing as npt
-
-from collections import Counter
+import pandas as pd
+from pandas_ops.misc import cast_to_array_if_possible
+from pandas_ops.sortedness import encode_sort_key, lex_argsort, pack_keys, take
 
 
 @numba.njit
@@ -20,60 +23,617 @@ def sum_real_good(xx: npt.NDArray, *args):
     return np.sum(xx)
 
 
+@numba.njit(inline="always")
+def add_to_moments(
+    x: float,
+    w: float,
+    total_weight: float,
+    mean: float,
+    m2: float,
+    m3: float,
+    m4: float,
+    higher: bool,
+) -> tuple[float, float, float, float, float]:
+    """Add value `x` of weight `w` to central moment sums with Pébay's single pass updates.
+
+    Higher sums `m3` and `m4` are updated only if `higher`.
+    With `w = 1` these are Welford's updates, and `m2` alone gives West's weighted variance.
+
+    Returns:
+        tuple: Updated total weight, mean, and sums of squared, cubed, and 4th powers of deviations.
+    """
+    if w == 0.0:
+        return total_weight, mean, m2, m3, m4
+    new_weight = total_weight + w
+    delta = x - mean
+    delta_w = delta * w / new_weight
+    term = total_weight * delta * delta_w
+    if higher:
+        m4 += (
+            term
+            * delta_w
+            * delta_w
+            * (total_weight * total_weight - total_weight * w + w * w)
+            / (w * w)
+            + 6.0 * delta_w * delta_w * m2
+            - 4.0 * delta_w * m3
+        )
+        m3 += term * delta_w * (total_weight - w) / w - 3.0 * delta_w * m2
+    m2 += term
+    mean += delta_w
+    return new_weight, mean, m2, m3, m4
+
+
+@numba.njit(inline="always")
+def add_to_co_moment(
+    x: float,
+    y: float,
+    w: float,
+    total_weight: float,
+    mean_x: float,
+    mean_y: float,
+    co_moment: float,
+) -> tuple[float, float, float, float]:
+    """Add pair `(x, y)` of weight `w` to the sum of products of deviations with West's single pass update.
+
+    Returns:
+        tuple: Updated total weight, means of x and y, and the co-moment.
+    """
+    if w == 0.0:
+        return total_weight, mean_x, mean_y, co_moment
+    new_weight = total_weight + w
+    delta_x = x - mean_x
+    mean_x += delta_x * w / new_weight
+    mean_y += (y - mean_y) * w / new_weight
+    co_moment += w * delta_x * (y - mean_y)
+    return new_weight, mean_x, mean_y, co_moment
+
+
+@numba.njit
+def weighted_moments(
+    xx: npt.NDArray, weights: npt.NDArray, *args
+) -> tuple[float, float, float, float]:
+    """Get weighted mean, variance, skewness and excess kurtosis in one pass without temporaries.
+
+    Variance, skewness and kurtosis are the population ones. All are NaN for zero total weight.
+
+    Arguments:
+        xx (npt.NDArray): Values.
+        weights (npt.NDArray): Weights of values, or an empty array for equal weights.
+
+    Returns:
+        tuple[float, float, float, float]: Mean, variance, skewness and excess kurtosis.
+    """
+    weighted = len(weights) > 0
+    total_weight = mean = m2 = m3 = m4 = 0.0
+    for i in range(len(xx)):
+        total_weight, mean, m2, m3, m4 = add_to_moments(
+            xx[i], weights[i] if weighted else 1.0, total_weight, mean, m2, m3, m4, True
+        )
+    if total_weight == 0.0:
+        return np.nan, np.nan, np.nan, np.nan
+    return (
+        mean,
+        m2 / total_weight,
+        np.sqrt(total_weight) * m3 / m2**1.5,
+        total_weight * m4 / (m2 * m2) - 3.0,
+    )
+
+
 @numba.njit
 def weighted_mean_and_var(
     xx: npt.NDArray, weights: npt.NDArray, *args
 ) -> tuple[float, float]:
-    weights = weights.astype(np.float64) / weights.sum()
-    _weighted_mean = np.average(
-        xx,
-        weights=weights,
-    )  # and this is float
-    _weighted_var = np.average(
-        (xx - _weighted_mean) ** 2,
-        weights=weights,
-    )
-    return _weighted_mean, _weighted_var
+    """Get weighted mean and population variance in one pass without temporaries (West's algorithm)."""
+    total_weight = mean = m2 = m3 = m4 = 0.0
+    for i in range(len(xx)):
+        total_weight, mean, m2, m3, m4 = add_to_moments(
+            xx[i], weights[i], total_weight, mean, m2, m3, m4, False
+        )
+    if total_weight == 0.0:
+        return np.nan, np.nan
+    return mean, m2 / total_weight
+
+
+@numba.njit
+def weighted_covariance(
+    xx: npt.NDArray, yy: npt.NDArray, weights: npt.NDArray, *args
+) -> float:
+    """Get the weighted population covariance of `xx` and `yy` in one pass without temporaries.
+
+    Arguments:
+        xx (npt.NDArray): Values.
+        yy (npt.NDArray): Other values.
+        weights (npt.NDArray): Weights of pairs of values, or an empty array for equal weights.
+
+    Returns:
+        float: Covariance, NaN for zero total weight.
+    """
+    weighted = len(weights) > 0
+    total_weight = mean_x = mean_y = co_moment = 0.0
+    for i in range(len(xx)):
+        total_weight, mean_x, mean_y, co_moment = add_to_co_moment(
+            xx[i],
+            yy[i],
+            weights[i] if weighted else 1.0,
+            total_weight,
+            mean_x,
+            mean_y,
+            co_moment,
+        )
+    return co_moment / total_weight if total_weight > 0.0 else np.nan
+
+
+@numba.njit(parallel=True)
+def group_moments(
+    idx: npt.NDArray,
+    xx: npt.NDArray,
+    weights: npt.NDArray,
+    yy: npt.NDArray,
+    total_weights: npt.NDArray,
+    means: npt.NDArray,
+    variances: npt.NDArray,
+    skewnesses: npt.NDArray,
+    kurtoses: npt.NDArray,
+    covariances: npt.NDArray,
+) -> None:
+    """Compute weighted moments of `xx` over contiguous groups in one parallel pass, as `weighted_moments` and `weighted_covariance` do.
+
+    Group `g` spans `xx[idx[g]:idx[g+1]]`.
+    Outputs of length 0 are not computed.
+
+    Arguments:
+        idx (npt.NDArray): Group starts followed by the length of `xx`, e.g. `LexicographicIndex.idx`.
+        xx (npt.NDArray): Values.
+        weights (npt.NDArray): Weights of values, or an empty array for equal weights.
+        yy (npt.NDArray): Values to compute covariances with, or an empty array.
+        total_weights, means, variances, skewnesses, kurtoses, covariances (npt.NDArray): Per group outputs.
+    """
+    weighted = len(weights) > 0
+    higher = len(skewnesses) > 0 or len(kurtoses) > 0
+    do_covariance = len(covariances) > 0
+    for g in numba.prange(len(idx) - 1):
+        total_weight = mean = m2 = m3 = m4 = 0.0
+        pair_weight = mean_x = mean_y = co_moment = 0.0
+        for i in range(idx[g], idx[g + 1]):
+            w = weights[i] if weighted else 1.0
+            if do_covariance:
+                pair_weight, mean_x, mean_y, co_moment = add_to_co_moment(
+                    xx[i], yy[i], w, pair_weight, mean_x, mean_y, co_moment
+                )
+            total_weight, mean, m2, m3, m4 = add_to_moments(
+                xx[i], w, total_weight, mean, m2, m3, m4, higher
+            )
+        empty = total_weight == 0.0
+        if len(total_weights) > 0:
+            total_weights[g] = total_weight
+        if len(means) > 0:
+            means[g] = np.nan if empty else mean
+        if len(variances) > 0:
+            variances[g] = np.nan if empty else m2 / total_weight
+        if len(skewnesses) > 0:
+            skewnesses[g] = np.nan if empty else np.sqrt(total_weight) * m3 / m2**1.5
+        if len(kurtoses) > 0:
+            kurtoses[g] = np.nan if empty else total_weight * m4 / (m2 * m2) - 3.0
+        if do_covariance:
+            covariances[g] = np.nan if empty else co_moment / total_weight
+
+
+@numba.njit(parallel=True)
+def group_reductions(
+    idx: npt.NDArray,
+    xx: npt.NDArray,
+    weights: npt.NDArray,
+    sum_zero,
+    sums: npt.NDArray,
+    means: npt.NDArray,
+    variances: npt.NDArray,
+    mins: npt.NDArray,
+    maxs: npt.NDArray,
+    argmaxs: npt.NDArray,
+) -> None:
+    """Compute several reductions of `xx` over contiguous groups in one parallel pass.
+
+    Group `g` spans `xx[idx[g]:idx[g+1]]`.
+    Outputs of length 0 are not computed.
+    Mean and variance are weighted if `weights` is not empty, and use West's single pass updates.
+    Variance is the population one, as in `weighted_mean_and_var`.
+
+    Arguments:
+        idx (npt.NDArray): Group starts followed by the length of `xx`, e.g. `LexicographicIndex.idx`.
+        xx (npt.NDArray): Values.
+        weights (npt.NDArray): Weights of values, or an empty array.
+        sum_zero: Zero of the type used to accumulate sums.
+        sums, means, variances, mins, maxs (npt.NDArray): Per group outputs.
+        argmaxs (npt.NDArray): Per group outputs: row in `xx` of the first maximum.
+    """
+    weighted = len(weights) > 0
+    do_moments = len(means) > 0 or len(variances) > 0
+    do_extrema = len(mins) > 0 or len(maxs) > 0 or len(argmaxs) > 0
+    for g in numba.prange(len(idx) - 1):
+        start = idx[g]
+        stop = idx[g + 1]
+        _sum = sum_zero
+        total_weight = mean = m2 = m3 = m4 = 0.0
+        _min = xx[start]
+        _max = xx[start]
+        _argmax = start
+        for i in range(start, stop):
+            x = xx[i]
+            _sum += x
+            if do_moments:
+                total_weight, mean, m2, m3, m4 = add_to_moments(
+                    x,
+                    weights[i] if weighted else 1.0,
+                    total_weight,
+                    mean,
+                    m2,
+                    m3,
+                    m4,
+                    False,
+                )
+            if do_extrema:
+                if x < _min:
+                    _min = x
+                if x > _max:
+                    _max = x
+                    _argmax = i
+        if len(sums) > 0:
+            sums[g] = _sum
+        if len(means) > 0:
+            means[g] = mean if total_weight > 0.0 else np.nan
+        if len(variances) > 0:
+            variances[g] = m2 / total_weight if total_weight > 0.0 else np.nan
+        if len(mins) > 0:
+            mins[g] = _min
+        if len(maxs) > 0:
+            maxs[g] = _max
+        if len(argmaxs) > 0:
+            argmaxs[g] = _argmax
+
+
+def get_sum_dtype(dtype: npt.DTypeLike) -> np.dtype:
+    """Get the dtype used to accumulate sums of values of `dtype`, like `np.sum` does."""
+    return np.zeros(0, dtype=dtype).sum().dtype
+
+
+@numba.njit(parallel=True)
+def _fill_histograms_1D(xx: npt.NDArray, min_x, counts: npt.NDArray) -> None:
+    """Count `xx - min_x` in private histograms, one per chunk of `xx`."""
+    chunks_cnt = counts.shape[0]
+    for c in numba.prange(chunks_cnt):
+        for i in range(c * len(xx) // chunks_cnt, (c + 1) * len(xx) // chunks_cnt):
+            counts[c, np.uint64(xx[i]) - np.uint64(min_x)] += 1
+
+
+@numba.njit(parallel=True)
+def _fill_histograms_2D(
+    xx: npt.NDArray, yy: npt.NDArray, min_x, min_y, size_y: int, counts: npt.NDArray
+) -> None:
+    """Count `(xx - min_x, yy - min_y)` in flattened private histograms, one per chunk of rows."""
+    chunks_cnt = counts.shape[0]
+    for c in numba.prange(chunks_cnt):
+        for i in range(c * len(xx) // chunks_cnt, (c + 1) * len(xx) // chunks_cnt):
+            counts[
+                c,
+                (np.uint64(xx[i]) - np.uint64(min_x)) * np.uint64(size_y)
+                + (np.uint64(yy[i]) - np.uint64(min_y)),
+            ] += 1
+
+
+@numba.njit(parallel=True)
+def _merge_histograms(counts: npt.NDArray, out: npt.NDArray) -> npt.NDArray:
+    for k in numba.prange(counts.shape[1]):
+        out[k] = counts[:, k].sum()
+    return out
+
+
+@numba.njit
+def _get_histograms_cnt(size: int, histogram_size: int) -> int:
+    """Number of private histograms: at most one per thread and together not bigger than the data."""
+    return max(1, min(numba.get_num_threads(), size // histogram_size))
 
 
 @numba.njit(boundscheck=True)
 def count1D(
     xx: npt.NDArray,
+    max_dense_size: int = 1 << 27,
 ) -> tuple[npt.NDArray, float | int, float | int]:
+    """Count occurrences of integers, in parallel.
+
+    Counts are offset by the minimum: `cnts[x - min_x]` counts `x`.
+    Threads fill private histograms merged in the end.
+    When the range of values is bigger than their number, they are counted into a single histogram instead.
+    Use `countND` to count values whose range does not fit into a histogram.
+
+    Arguments:
+        xx (npt.NDArray): Integers.
+        max_dense_size (int): Maximal number of bins of the histogram.
+
+    Returns:
+        tuple: Counts (uint64), the minimum and the maximum of `xx`.
     """
-    Do not try to optimize that by multithreading please without thinking of race conditions.
-    """
+    assert len(xx) > 0, "Cannot count an empty array."
     min_x, max_x = min_max(xx)
-    cnts = np.zeros(dtype=np.uint64, shape=max_x + 1)
-    for i in range(len(xx)):
-        cnts[xx[i]] += 1
-
-    return cnts, min_x, max_x
+    assert (
+        np.uint64(max_x) - np.uint64(min_x) < max_dense_size
+    ), "Range of values exceeds max_dense_size: count them with countND."
+    size = int(np.uint64(max_x) - np.uint64(min_x)) + 1
+    counts = np.zeros((_get_histograms_cnt(len(xx), size), size), dtype=np.uint64)
+    _fill_histograms_1D(xx, min_x, counts)
+    if counts.shape[0] == 1:
+        return counts[0], min_x, max_x
+    return _merge_histograms(counts, np.empty(size, dtype=np.uint64)), min_x, max_x
 
 
 @numba.njit(boundscheck=True)
 def count2D(
     xx: npt.NDArray,
     yy: npt.NDArray,
+    max_dense_size: int = 1 << 27,
 ) -> tuple[npt.NDArray, float | int, float | int, float | int, float | int]:
+    """Count occurrences of pairs of integers, in parallel.
+
+    Counts are offset by the minima: `cnts[x - min_x, y - min_y]` counts `(x, y)`.
+    Counting is done as in `count1D` on flattened positions.
+    Use `countND` to count pairs whose ranges do not fit into a histogram.
+
+    Arguments:
+        xx (npt.NDArray): Integers.
+        yy (npt.NDArray): Integers.
+        max_dense_size (int): Maximal number of bins of the histogram.
+
+    Returns:
+        tuple: Counts (uint64), the minimum and the maximum of `xx`, and the minimum and the maximum of `yy`.
     """
-    Do not try to optimize that by multithreading please without thinking of race conditions.
-    """
+    assert len(xx) > 0, "Cannot count an empty array."
     assert len(xx) == len(yy)
     min_x, max_x = min_max(xx)
     min_y, max_y = min_max(yy)
-    cnts = np.zeros(dtype=np.uint64, shape=(max_x + 1, max_y + 1))
+    range_x = np.uint64(max_x) - np.uint64(min_x)
+    range_y = np.uint64(max_y) - np.uint64(min_y)
+    assert (
+        range_x < max_dense_size
+        and range_y < max_dense_size
+        and (range_x + 1) * (range_y + 1) <= max_dense_size
+    ), "Ranges of values exceed max_dense_size: count them with countND."
+    size_x = int(range_x) + 1
+    size_y = int(range_y) + 1
+    size = size_x * size_y
+    counts = np.zeros((_get_histograms_cnt(len(xx), size), size), dtype=np.uint64)
+    _fill_histograms_2D(xx, yy, min_x, min_y, size_y, counts)
+    if counts.shape[0] == 1:
+        cnts = counts[0]
+    else:
+        cnts = _merge_histograms(counts, np.empty(size, dtype=np.uint64))
+    return cnts.reshape(size_x, size_y), min_x, max_x, min_y, max_y
+
+
+@numba.njit(parallel=True)
+def _unpack_keys(
+    keys: npt.NDArray, shift: int, mask: np.uint64, min_x, out: npt.NDArray
+) -> npt.NDArray:
+    """Inverse of packing offsets from `min_x` at bit `shift` of `keys`."""
+    for i in numba.prange(len(keys)):
+        out[i] = np.uint64(min_x) + ((keys[i] >> np.uint64(shift)) & mask)
+    return out
+
+
+def _count_packed(
+    columns: list[npt.NDArray], encoded: list[tuple[npt.NDArray, int]]
+) -> tuple[list[npt.NDArray], npt.NDArray]:
+    """Count rows of integer columns packed into one uint64 key and unpack the unique keys."""
+    from pandas_ops.uniqueness import get_unique
+
+    keys = encoded[0][0]
+    for col_keys, bits in encoded[1:]:
+        pack_keys(keys, col_keys, bits)
+    unique_keys, counts = get_unique(keys, return_counts=True)
+    unique_columns = []
+    shift = sum(bits for _, bits in encoded)
+    for col, (_, bits) in zip(columns, encoded):
+        shift -= bits
+        out = np.empty(len(unique_keys), dtype=col.dtype)
+        if bits == 0:
+            out[:] = col[0]
+        else:
+            _unpack_keys(unique_keys, shift, np.uint64((1 << bits) - 1), col.min(), out)
+        unique_columns.append(out)
+    return unique_columns, counts
+
+
+def _count_sorted(columns: list[npt.NDArray]) -> tuple[list[npt.NDArray], npt.NDArray]:
+    """Count rows by sorting them lexicographically and measuring runs of equal rows."""
+    from pandas_ops.lex_ops import get_lex_index
+
+    perm = lex_argsort(*columns)
+    columns = [take(col, perm, np.empty_like(col)) for col in columns]
+    del perm
+    idx = get_lex_index(*columns)
+    starts = idx[:-1]
+    unique_columns = [
+        take(col, starts, np.empty(len(starts), col.dtype)) for col in columns
+    ]
+    return unique_columns, np.diff(idx)
 
-    for i in range(len(xx)):
-        cnts[xx[i], yy[i]] += 1
 
-    return cnts, min_x, max_x, min_y, max_y
+def countND(*args: npt.NDArray | pd.Series, names: list | None = None) -> pd.DataFrame:
+    """Count occurrences of rows of columns, in parallel.
 
+    Integer columns whose ranges fit into 64 bits together are packed into one uint64 key counted with `get_unique`.
+    Other columns are sorted lexicographically and runs of equal rows are counted.
 
-def countND(*args: npt.NDArray):
-    """A function difficult to code in numba."""
-    return Counter(zip(*args))
+    Arguments:
+        *args (npt.NDArray|pd.Series): Numeric key columns of the same length.
+        names (list|None): Names of key columns. Defaults to names of series, or positions.
+
+    Returns:
+        pd.DataFrame: Unique rows sorted lexicographically and their counts in column `count`.
+    """
+    if names is None:
+        names = [getattr(arg, "name", None) for arg in args]
+        names = [i if name is None else name for i, name in enumerate(names)]
+    assert len(names) == len(args), "Provide one name per column."
+    assert "count" not in names, "Column name `count` is reserved for counts."
+    columns = [cast_to_array_if_possible(arg) for arg in args]
+    assert len(columns) > 0, "Provide at least one column."
+    for col in columns:
+        assert len(col) == len(columns[0]), "Columns have different lengths."
+        assert col.dtype.kind in "biuf", f"Can count only numbers, got {col.dtype}."
+
+    if len(columns[0]) == 0:
+        unique_columns, counts = columns, np.empty(0, dtype=np.uint64)
+    elif all(col.dtype.kind in "iu" for col in columns):
+        encoded = [encode_sort_key(col) for col in columns]
+        if sum(bits for _, bits in encoded) <= 64:
+            unique_columns, counts = _count_packed(columns, encoded)
+        else:
+            del encoded
+            unique_columns, counts = _count_sorted(columns)
+    else:
+        unique_columns, counts = _count_sorted(columns)
+
+    res = pd.DataFrame(dict(zip(names, unique_columns)), copy=False)
+    res["count"] = counts.astype(np.uint64)
+    return res
+
+
+class KLLSketch:
+    """Mergeable quantile sketch of Karnin, Lang and Liberty.
+
+    Keeps levels of sorted samples, the samples of level `h` standing for `2**h` values each.
+    A level over its capacity is compacted: every other of its sorted samples, starting at a random one, is promoted one level up.
+    Capacities shrink by the factor `2/3` going down from the top level, so the sketch holds `O(k)` samples regardless of the number of values.
+    The normalized rank error of quantiles is about `2.296 / k**0.9723` with high probability, e.g. 1.3% for k=200.
+    Sketches with the same `k` merge into a sketch of the union of their values and can be pickled.
+    NaNs are skipped.
+
+    Arguments:
+        k (int): Capacity of the top level: accuracy against memory.
+        seed (int|None): Seed of the random compactions.
+    """
+
+    def __init__(self, k: int = 200, seed: int | None = None):
+        assert k >= 8, "Use k of at least 8."
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.n = 0
+        self.min = np.nan
+        self.max = np.nan
+
+    def __repr__(self):
+        return (
+            f"KLLSketch(k={self.k}, n={self.n}, samples={sum(map(len, self.levels))})"
+        )
+
+    @property
+    def rank_error(self) -> float:
+        return 2.296 / self.k**0.9723
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                samples = np.sort(self.levels[level])
+                odd = len(samples) % 2
+                promoted = samples[odd:][self.rng.integers(2) :: 2]
+                self.levels[level] = samples[:odd]
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], promoted]
+                )
+            level += 1
+
+    def update(self, xx: npt.ArrayLike) -> "KLLSketch":
+        """Add values to the sketch."""
+        xx = np.asarray(xx, dtype=np.float64).ravel()
+        xx = xx[~np.isnan(xx)]
+        if len(xx) == 0:
+            return self
+        self.min = np.fmin(self.min, xx.min())
+        self.max = np.fmax(self.max, xx.max())
+        self.n += len(xx)
+        self.levels[0] = np.concatenate([self.levels[0], xx])
+        self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Add values summarized by another sketch to this one."""
+        assert self.k == other.k, "Cannot merge sketches with different `k`."
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, samples in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], samples])
+        self.n += other.n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._compress()
+        return self
+
+    def _get_weighted_samples(self) -> tuple[npt.NDArray, npt.NDArray]:
+        samples = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [
+                np.full(len(s), 2**level, dtype=np.int64)
+                for level, s in enumerate(self.levels)
+            ]
+        )
+        order = np.argsort(samples, kind="stable")
+        return samples[order], np.cumsum(weights[order])
+
+    def quantile(self, qs: float | npt.ArrayLike) -> float | npt.NDArray:
+        """Approximate quantiles of added values, 0 and 1 giving their exact minimum and maximum."""
+        assert self.n > 0, "The sketch is empty."
+        qs_arr = np.asarray(qs, dtype=np.float64)
+        assert np.all((0 <= qs_arr) & (qs_arr <= 1)), "Quantiles must be in [0, 1]."
+        samples, cum_weights = self._get_weighted_samples()
+        pos = np.searchsorted(cum_weights, qs_arr * cum_weights[-1], side="left")
+        res = samples[np.minimum(pos, len(samples) - 1)]
+        res = np.where(qs_arr == 0, self.min, np.where(qs_arr == 1, self.max, res))
+        return res if res.ndim else float(res)
+
+    def rank(self, x: float) -> float:
+        """Approximate fraction of added values not bigger than `x`."""
+        assert self.n > 0, "The sketch is empty."
+        samples, cum_weights = self._get_weighted_samples()
+        pos = np.searchsorted(samples, x, side="right")
+        return float(cum_weights[pos - 1] / cum_weights[-1]) if pos else 0.0
+
+
+def sketch_columns(
+    batches: typing.Iterable[pd.DataFrame],
+    columns: list[str] | None = None,
+    k: int = 200,
+    seed: int | None = None,
+) -> dict[str, KLLSketch]:
+    """Summarize numeric columns of a table fed batch by batch with quantile sketches.
+
+    Arguments:
+        batches (Iterable[pd.DataFrame]): Batches of rows, e.g. from `iteration.iter_df_batches` or `io.iter_df`.
+        columns (list[str]|None): Columns to sketch. By default, the numeric columns of the first batch.
+        k (int): Sketch accuracy parameter, see `KLLSketch`.
+        seed (int|None): Seed of the sketches.
+
+    Returns:
+        dict[str, KLLSketch]: Column name to sketch. Merge sketches of different files with `KLLSketch.merge`.
+    """
+    sketches = {} if columns is None else {col: KLLSketch(k, seed) for col in columns}
+    for batch in batches:
+        if columns is None:
+            columns = list(batch.select_dtypes("number").columns)
+            sketches = {col: KLLSketch(k, seed) for col in columns}
+        for col in columns:
+            sketches[col].update(batch[col].to_numpy())
+    return sketches
 
 
 def quantiles(xx, bin_cnt=5):
+    if isinstance(xx, KLLSketch):
+        return xx.quantile(np.linspace(0, 1, bin_cnt + 1))
     return np.quantile(xx, np.linspace(0, 1, bin_cnt + 1))
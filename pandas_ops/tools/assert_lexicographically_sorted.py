@@ -1,7 +1,7 @@
 import click
 
-from pandas_ops.io import read_df
-from pandas_ops.sortedness import is_sorted_lexicographically
+from pandas_ops.io import iter_df, read_df
+from pandas_ops.sortedness import find_breakers_in_batches, is_sorted_lexicographically
 from pathlib import Path
 
 
@@ -9,10 +9,24 @@ from pathlib import Path
 @click.argument("input_path", type=Path)
 @click.argument("columns", nargs=-1)
 @click.option("--strictly", is_flag=True)
+@click.option(
+    "--batch_rows",
+    type=int,
+    default=None,
+    help="Stream the table in batches of that many rows instead of loading it whole.",
+)
+@click.option(
+    "--max_breakers",
+    type=int,
+    default=10,
+    help="Maximal number of breaking rows reported in streaming mode.",
+)
 def assert_lexicographically_sorted(
     input_path: Path,
     columns: list[str],
     strictly: bool = False,
+    batch_rows: int | None = None,
+    max_breakers: int = 10,
 ) -> None:
     """Check a table is lexicographically sorted w.r.t. the provided columns.\n
 
@@ -24,6 +38,21 @@ def assert_lexicographically_sorted(
         print("None.d is trivially lexicographically sorted.")
         return None
 
+    if batch_rows is not None:
+        breakers = find_breakers_in_batches(
+            (
+                [batch[col] for col in columns]
+                for batch in iter_df(input_path, columns=columns, batch_rows=batch_rows)
+            ),
+            strictly=strictly,
+            max_cnt=max_breakers,
+        )
+        assert (
+            len(breakers) == 0
+        ), f"`{input_path}` is not lexicographically sorted by {columns}: rows {breakers} break the order."
+        print(f"`{input_path}` is lexicographically sorted by {columns}.")
+        return None
+
     data = read_df(input_path, columns=columns)
     assert is_sorted_lexicographically(
         *[data[col] for col in columns], strictly=strictly
@@ -2,8 +2,7 @@
 import argparse
 from pathlib import Path
 
-import pandas as pd
-from tqdm import tqdm
+from pandas_ops.io import concat_tables
 
 parser = argparse.ArgumentParser(description="Concatenate tables.")
 parser.add_argument(
@@ -18,23 +17,19 @@ parser.add_argument(
     type=Path,
     nargs="+",
 )
+parser.add_argument(
+    "--workers",
+    help="Number of threads reading tables concurrently.",
+    type=int,
+    default=8,
+)
 args = parser.parse_args()
 
 
 def main(args):
-    ext_2_reader = {
-        ".csv": pd.read_csv,
-        ".feather": pd.read_feather,
-    }
-
-    def stream_of_dfs():
-        for p in args.path:
-            df = ext_2_reader[p.suffix](p)
-            if len(df) > 0:
-                yield df
-
-    combined_df = pd.concat(stream_of_dfs(), ignore_index=True)
-    combined_df.to_feather(args.output)
+    concat_tables(
+        args.path, output=args.output, columns="union", max_workers=args.workers
+    )
 
 
 if __name__ == "__main__":
@@ -4,7 +4,7 @@ import sys
 from pathlib import Path
 
 import pandas as pd
-from pandas_ops.io import read_df
+from pandas_ops.io import read_table
 from pandas_ops.printing import get_to_show
 
 parser = argparse.ArgumentParser(
@@ -18,7 +18,8 @@ parser.add_argument(
 parser.add_argument(
     "-c",
     "--column",
-    help="Column to use in the plot. May be an expression that'll be eval()'d. Prefix with \"data.\"",
+    help="Column to use in the plot. May be an expression that'll be eval()'d. Prefix with \"data.\" "
+    "Only columns used in it are read, unless it calls DataFrame methods like data.query(...), which read the whole table.",
     type=str,
     required=True,
 )
@@ -40,7 +41,7 @@ args = parser.parse_args()
 
 
 def main(args):
-    data = read_df(file_path=args.data_path)
+    data = read_table(args.data_path)
     to_plot = eval(args.column)
     if args.outliers:
         import numpy as np
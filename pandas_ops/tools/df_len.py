@@ -30,13 +30,28 @@ parser.add_argument(
     help="Return a csv.",
     action="store_true",
 )
+parser.add_argument(
+    "--workers",
+    help="Number of threads counting rows of files concurrently.",
+    type=int,
+    default=32,
+)
 args = parser.parse_args()
 
 
 def main(args):
+    counts = []
+    for path, count, error in pandas_ops.io.read_many(
+        args.data_paths, max_workers=args.workers, reader=pandas_ops.io.count_rows
+    ):
+        if error is not None:
+            print(f"Error counting rows of `{path}`: {error}", file=sys.stderr)
+        counts.append(count)
     df = pd.DataFrame(
-        ((str(path), len(pandas_ops.io.read_df(path))) for path in args.data_paths),
-        columns=["path", "count"],
+        {
+            "path": [str(path) for path in args.data_paths],
+            "count": pd.array(counts, dtype="Int64"),  # failed paths are <NA>
+        }
     )
     df["cumulated_count"] = df["count"].cumsum()
     if args.preview or args.csv:
@@ -2,12 +2,21 @@
 import argparse
 import pathlib
 import re
+import sys
 from pprint import pprint
 
 import duckdb
+import numpy as np
 import pandas as pd
 import tomllib
-from pandas_ops.io import read_df, save_df2
+from pandas_ops.io import (
+    concat_tables,
+    constant_categorical,
+    encode_constants,
+    read_many,
+    save_df2,
+    stores_categoricals,
+)
 
 parser = argparse.ArgumentParser(
     "Combine multiple table files into one and add in meta info by regex-based parsing the submitted paths.",
@@ -61,16 +70,21 @@ parser.add_argument(
     default="in_path",
     type=str,
 )
+parser.add_argument(
+    "--workers",
+    help="Number of threads reading tables concurrently.",
+    default=8,
+    type=int,
+)
 
 
 args = parser.parse_args().__dict__
 
 
 def main(args):
-    dfs = []
     _verbose = args["verbose"]
 
-    df_filter = lambda df: df
+    df_filter = None
     if args["sql"]:
         duckcon = duckdb.connect()
         with open(args["sql"], "rb") as f:
@@ -86,6 +100,8 @@ def main(args):
         path_pattern.groupindex
     ), f"It seems that the provided name of table index, `{args['name_of_table_index']}`, coincides with a name of one of the named patterns in the provided regular expression used to parse the paths of tables,\n`{args['paths_regex']}`\nMake adjustements."
 
+    table_ids = []
+    paths = []
     for table_id, path in enumerate(args["inputs"]):
         if _verbose:
             print(path)
@@ -93,35 +109,75 @@ def main(args):
             if _verbose:
                 print(f"Missing `{path}`")
         else:
-            df = read_df(path)
+            table_ids.append(table_id)
+            paths.append(path)
+
+    metas = []
+    for table_id, path in zip(table_ids, paths):
+        meta = {}
+        if len(args["name_of_table_index"]) > 0:
+            meta[args["name_of_table_index"]] = table_id
+        if len(args["name_of_path_name_column"]) > 0:
+            meta[args["name_of_path_name_column"]] = str(path)
+        match = path_pattern.search(str(path))
+        if match:
+            meta.update(match.groupdict())
+        metas.append(meta)
+
+    if len(paths) == 0:
+        return None
+    partition_cols = args["partition_cols"]
+    categorical = stores_categoricals(args["output"])
+    if df_filter is None:
+        if (
+            partition_cols
+            and set(partition_cols) <= {col for meta in metas for col in meta}
+            and args["output"].suffix == ".parquet"
+        ):  # values parsed from paths become directory names only
+            concat_tables(
+                paths,
+                output=args["output"],
+                constants=metas,
+                partition_cols=partition_cols,
+                columns="union",
+                errors="skip",
+                max_workers=args["workers"],
+            )
+            return None
+        out = concat_tables(
+            paths,
+            constants=metas,
+            categorical=categorical,
+            columns="union",
+            errors="skip",
+            max_workers=args["workers"],
+        )
+    else:  # filtered row counts are unknown upfront
+        categories, codes = encode_constants(metas)
+        dfs = []
+        for table_codes, (path, df, error) in zip(
+            codes, read_many(paths, max_workers=args["workers"])
+        ):
+            if error is not None:
+                print(f"Error reading `{path}`: {error}", file=sys.stderr)
+                continue
             df = df_filter(df)
-            meta = {}
-            if len(args["name_of_table_index"]) > 0:
-                meta[args["name_of_table_index"]] = table_id
-            if len(args["name_of_path_name_column"]) > 0:
-                meta[args["name_of_path_name_column"]] = str(path)
-            match = path_pattern.search(str(path))
-            if match:
-                meta.update(match.groupdict())
-            if len(meta) > 0:
-                meta = pd.DataFrame([meta] * len(df))
-                df = pd.concat([meta, df], axis=1)
-
+            for position, (col, code) in enumerate(table_codes.items()):
+                values = constant_categorical(code, len(df), categories[col])
+                df.insert(position, col, values if categorical else np.asarray(values))
             dfs.append(df)
+        if len(dfs) == 0:
+            return None
+        out = pd.concat(dfs, ignore_index=True)
 
     if _verbose:
-        pprint(dfs)
-    if len(dfs) > 0:
-        out = pd.concat(
-            dfs,
-            ignore_index=True,
-        )
-        save_df2(
-            out,
-            args["output"],
-            index=False,
-            partition_cols=args["partition_cols"],
-        )
+        pprint(out)
+    save_df2(
+        out,
+        args["output"],
+        index=False,
+        partition_cols=partition_cols,
+    )
 
 
 # TODO: test it under csvs using different paths.
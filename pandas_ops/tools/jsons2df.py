@@ -2,35 +2,43 @@ import argparse
 import json
 import pandas as pd
 
-from pandas_ops.io import save_df
+from pandas_ops.io import read_many, save_df
 from pathlib import Path
 
 
-def load_json_files(paths):
-    """ChatGPT generated code."""
+def read_json_records(path: Path) -> list[dict]:
+    """Read dicts stored in a json file, alone or in a list, marking their source path."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
     records = []
+    if isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict):
+                item["_source_path"] = str(path)
+                records.append(item)
+            else:
+                print(f"Skipping non-dict item in list from {path}")
+    elif isinstance(data, dict):
+        data["_source_path"] = str(path)
+        records.append(data)
+    else:
+        print(f"Unsupported JSON structure in {path}")
+    return records
+
 
-    for path_str in paths:
-        path = Path(path_str).resolve()
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"Error reading {path}: {e}")
-            continue
-
-        if isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict):
-                    item["_source_path"] = str(path)
-                    records.append(item)
-                else:
-                    print(f"Skipping non-dict item in list from {path}")
-        elif isinstance(data, dict):
-            data["_source_path"] = str(path)
-            records.append(data)
+def load_json_files(paths, max_workers: int = 8):
+    """Read json files concurrently into one DataFrame, skipping unreadable files."""
+    records = []
+    for path, path_records, error in read_many(
+        (Path(path_str).resolve() for path_str in paths),
+        max_workers=max_workers,
+        reader=read_json_records,
+    ):
+        if error is not None:
+            print(f"Error reading {path}: {error}")
         else:
-            print(f"Unsupported JSON structure in {path}")
+            records.extend(path_records)
 
     return pd.DataFrame(records)
 
@@ -41,9 +49,15 @@ def main():
     )
     parser.add_argument("output", help="Path to output table.")
     parser.add_argument("paths", nargs="+", help="Paths to JSON files")
+    parser.add_argument(
+        "--workers",
+        help="Number of threads reading files concurrently.",
+        type=int,
+        default=8,
+    )
     args = parser.parse_args()
 
-    df = load_json_files(args.paths)
+    df = load_json_files(args.paths, max_workers=args.workers)
     print(df)
 
     save_df(df, args.output)
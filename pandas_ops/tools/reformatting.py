@@ -15,6 +15,9 @@ import pandas as pd
 import toml
 
 from opentimspy import OpenTIMS
+from pandas_ops.io import DfWriter
+from pandas_ops.io import is_streamable
+from pandas_ops.io import iter_df
 from pandas_ops.io import read_df
 from pandas_ops.io import save_df
 from pandas_ops.parsers.misc import parse_key_equal_value
@@ -77,9 +80,16 @@ def tdf_to_startrek(in_tdf, out_startrek, progressbar: str = ""):
 def trivial_translator(
     input: pathlib.Path,
     output: pathlib.Path,
+    batch_rows: int = 10_000_000,
     **kwargs,
 ) -> None:
-    """Translate a supported input into output using full RAM copy as intermediary."""
+    """Translate a supported input into output batch by batch, or using full RAM copy as intermediary if either format does not stream."""
+    if is_streamable(input) and DfWriter.supports(output):
+        with DfWriter(output) as writer:
+            for batch in iter_df(input, batch_rows=batch_rows, **kwargs):
+                writer.append(batch)
+        if writer.schema is not None:
+            return
     save_df(read_df(input, **kwargs), output)
 
 
@@ -95,7 +105,7 @@ _translators[(".d", ".startrek")] = tdf_to_startrek
 @click.option(
     "--kwarg",
     multiple=True,
-    help="Dynamic key-value pairs in key=value format.",
+    help="Dynamic key-value pairs in key=value format. Values are read as Python literals where possible, so `1,2` becomes a tuple and `1e3` a float, while `007` stays a string. Quote a value to keep it a string, e.g. key=\"'1,2'\".",
     type=parse_key_equal_value,
 )
 def reformat_table(
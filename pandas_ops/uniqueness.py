@@ -1,7 +1,17 @@
 import numba
 import numpy as np
 import numpy.typing as npt
+import pandas as pd
+from pandas_ops.lex_ops import LexicographicIndex, get_index_dtype, get_lex_index
+from pandas_ops.misc import cast_to_array_if_possible
 from pandas_ops.numba_ops import inputs_series_to_numpy
+from pandas_ops.sortedness import (
+    encode_sort_key,
+    is_nondecreasing,
+    pack_keys,
+    parallel_argsort,
+    take,
+)
 
 
 @inputs_series_to_numpy
@@ -12,23 +22,277 @@ def observe(unorded_ids: npt.NDArray, to_observe: npt.NDArray):
     return to_observe.nonzero()[0].astype(unorded_ids.dtype)
 
 
+@numba.njit
+def popcount(x: np.uint64) -> np.uint64:
+    """Number of set bits of a 64 bit word."""
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + (
+        (x >> np.uint64(2)) & np.uint64(0x3333333333333333)
+    )
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+@numba.njit(parallel=True)
+def _fill_bitmaps(
+    ids: npt.NDArray, min_id, chunk_ends: npt.NDArray, bitmaps: npt.NDArray
+) -> None:
+    """Set bits of `ids - min_id` in private bitmaps, one per chunk of ids."""
+    for c in numba.prange(len(chunk_ends) - 1):
+        for i in range(chunk_ends[c], chunk_ends[c + 1]):
+            pos = np.uint64(ids[i]) - np.uint64(min_id)
+            bitmaps[c, pos >> np.uint64(6)] |= np.uint64(1) << (pos & np.uint64(63))
+
+
+@numba.njit(parallel=True)
+def _merge_bitmaps(bitmaps: npt.NDArray, bitmap: npt.NDArray, ranks: npt.NDArray):
+    """OR private bitmaps into `bitmap` and count set bits per word into `ranks`."""
+    for w in numba.prange(bitmaps.shape[1]):
+        word = np.uint64(0)
+        for c in range(bitmaps.shape[0]):
+            word |= bitmaps[c, w]
+        bitmap[w] = word
+        ranks[w] = popcount(word)
+
+
+@numba.njit(parallel=True)
+def _bitmap_to_unique(
+    bitmap: npt.NDArray, ranks: npt.NDArray, min_id, unique: npt.NDArray
+) -> None:
+    """Write positions of set bits shifted by `min_id`, word `w` starting at `unique[ranks[w]]`."""
+    for w in numba.prange(len(bitmap)):
+        word = bitmap[w]
+        j = ranks[w]
+        for b in range(64):
+            if (word >> np.uint64(b)) & np.uint64(1):
+                unique[j] = np.uint64(min_id) + np.uint64(64 * w + b)
+                j += 1
+
+
+@numba.njit(parallel=True)
+def _bitmap_inverse(
+    ids: npt.NDArray,
+    min_id,
+    bitmap: npt.NDArray,
+    ranks: npt.NDArray,
+    inverse: npt.NDArray,
+) -> None:
+    """Dense rank of each id: the number of set bits before its own."""
+    for i in numba.prange(len(ids)):
+        pos = np.uint64(ids[i]) - np.uint64(min_id)
+        w = pos >> np.uint64(6)
+        below = (np.uint64(1) << (pos & np.uint64(63))) - np.uint64(1)
+        inverse[i] = ranks[w] + popcount(bitmap[w] & below)
+
+
+@numba.njit(parallel=True)
+def count_codes(codes: npt.NDArray, codes_cnt: int, chunks_cnt: int) -> npt.NDArray:
+    """Count occurrences of codes in `range(codes_cnt)` with private per chunk histograms merged in the end."""
+    counts = np.zeros((chunks_cnt, codes_cnt), dtype=np.int64)
+    for c in numba.prange(chunks_cnt):
+        for i in range(
+            c * len(codes) // chunks_cnt, (c + 1) * len(codes) // chunks_cnt
+        ):
+            counts[c, codes[i]] += 1
+    res = np.empty(codes_cnt, dtype=np.int64)
+    for k in numba.prange(codes_cnt):
+        res[k] = counts[:, k].sum()
+    return res
+
+
+def _get_chunks_cnt(ids_cnt: int, histogram_size: int) -> int:
+    """Number of private histograms: at most one per thread and together not much bigger than the ids."""
+    return max(1, min(numba.get_num_threads(), ids_cnt // max(histogram_size, 1)))
+
+
+def _unique_by_bitmap(ids, min_id, range_size, return_inverse, return_counts):
+    words_cnt = (range_size + 63) // 64
+    chunks_cnt = _get_chunks_cnt(len(ids), words_cnt)
+    bitmaps = np.zeros((chunks_cnt, words_cnt), dtype=np.uint64)
+    _fill_bitmaps(
+        ids, min_id, np.linspace(0, len(ids), chunks_cnt + 1).astype(np.int64), bitmaps
+    )
+    bitmap = np.empty(words_cnt, dtype=np.uint64)
+    ranks = np.empty(words_cnt, dtype=np.int64)
+    _merge_bitmaps(bitmaps, bitmap, ranks)
+    del bitmaps
+    unique_cnt = int(ranks.sum())
+    ranks = np.cumsum(ranks) - ranks
+    unique = np.empty(unique_cnt, dtype=ids.dtype)
+    _bitmap_to_unique(bitmap, ranks, min_id, unique)
+    inverse = counts = None
+    if return_inverse or return_counts:
+        inverse = np.empty(len(ids), dtype=np.int64)
+        _bitmap_inverse(ids, min_id, bitmap, ranks, inverse)
+    if return_counts:
+        counts = count_codes(inverse, unique_cnt, _get_chunks_cnt(len(ids), unique_cnt))
+    return unique, inverse, counts
+
+
+@numba.njit(parallel=True)
+def _sorted_groups_to_inverse(
+    perm: npt.NDArray, starts: npt.NDArray, inverse: npt.NDArray
+) -> None:
+    for g in numba.prange(len(starts) - 1):
+        for k in range(starts[g], starts[g + 1]):
+            inverse[perm[k]] = g
+
+
+def _unique_by_sorting(ids, return_inverse, return_counts):
+    keys, bits = encode_sort_key(ids)
+    sorted_keys, perm = parallel_argsort(keys, bits)
+    starts = get_lex_index(sorted_keys)
+    unique = take(ids, perm[starts[:-1]], np.empty(len(starts) - 1, dtype=ids.dtype))
+    inverse = counts = None
+    if return_inverse:
+        inverse = np.empty(len(ids), dtype=np.int64)
+        _sorted_groups_to_inverse(perm, starts, inverse)
+    if return_counts:
+        counts = np.diff(starts).astype(np.int64)
+    return unique, inverse, counts
+
+
+@numba.njit(parallel=True)
+def _fill_hash_counts(ids: npt.NDArray, chunk_ends: npt.NDArray, dicts) -> None:
+    for c in numba.prange(len(chunk_ends) - 1):
+        counts = dicts[np.int64(c)]
+        for i in range(chunk_ends[c], chunk_ends[c + 1]):
+            counts[ids[i]] = counts.get(ids[i], 0) + 1
+
+
+@numba.njit
+def _merge_hash_counts(dicts, unique: npt.NDArray):
+    """Merge counts of private dicts, sort keys, and map them onto their ranks."""
+    counts = dicts[0]
+    for c in range(1, len(dicts)):
+        for _id, cnt in dicts[c].items():
+            counts[_id] = counts.get(_id, 0) + cnt
+    unique = np.empty(len(counts), dtype=unique.dtype)
+    j = 0
+    for _id in counts.keys():
+        unique[j] = _id
+        j += 1
+    unique.sort()
+    unique_counts = np.empty(len(unique), dtype=np.int64)
+    for j in range(len(unique)):
+        unique_counts[j] = counts[unique[j]]
+        counts[unique[j]] = j
+    return unique, unique_counts, counts
+
+
+@numba.njit(parallel=True)
+def _hash_inverse(ids: npt.NDArray, ranks, inverse: npt.NDArray) -> None:
+    for i in numba.prange(len(ids)):
+        inverse[i] = ranks[ids[i]]
+
+
+def _unique_by_hashing(ids, return_inverse, return_counts):
+    chunks_cnt = max(1, min(numba.get_num_threads(), len(ids)))
+    key_type = numba.from_dtype(ids.dtype)
+    dicts = numba.typed.List(
+        [
+            numba.typed.Dict.empty(key_type=key_type, value_type=numba.int64)
+            for _ in range(chunks_cnt)
+        ]
+    )
+    _fill_hash_counts(
+        ids, np.linspace(0, len(ids), chunks_cnt + 1).astype(np.int64), dicts
+    )
+    unique, counts, ranks = _merge_hash_counts(dicts, ids[:0])
+    inverse = None
+    if return_inverse:
+        inverse = np.empty(len(ids), dtype=np.int64)
+        _hash_inverse(ids, ranks, inverse)
+    return unique, inverse, counts if return_counts else None
+
+
+def choose_unique_strategy(
+    ids: npt.NDArray,
+    range_size: int,
+    sample_size: int = 100_000,
+    max_distinct_ratio_for_hashing: float = 0.1,
+) -> str:
+    """Choose how to find unique ids.
+
+    * "bitmap" if the range of ids is at most 64 times their number, so that the bitmap is no bigger than int64 ids,
+    * "hash" if an evenly spaced sample of ids has few distinct values,
+    * "sort" otherwise.
+    """
+    if range_size <= 64 * len(ids):
+        return "bitmap"
+    sample = ids[:: max(1, len(ids) // sample_size)]
+    if len(np.unique(sample)) <= max_distinct_ratio_for_hashing * len(sample):
+        return "hash"
+    return "sort"
+
+
 @inputs_series_to_numpy
-def get_unique(ids: npt.NDArray, upper_limit: int | None = None) -> npt.NDArray:
+def get_unique(
+    ids: npt.NDArray,
+    upper_limit: int | None = None,
+    return_inverse: bool = False,
+    return_counts: bool = False,
+    strategy: str = "auto",
+) -> npt.NDArray | tuple[npt.NDArray, ...]:
     """
-    Return an array of sorted unique numbers.
+    Return an array of sorted unique numbers, in parallel.
+
+    Arguments:
+        ids (npt.NDArray): Integers.
+        upper_limit (int|None): Known upper limit of non-negative ids: ranges the bitmap over `range(upper_limit)`. Ids outside of it raise a ValueError.
+        return_inverse (bool): Also return the index of each id in the unique array, like `np.unique`.
+        return_counts (bool): Also return the number of occurrences of each unique id, like `np.unique`.
+        strategy (str): "bitmap" (packed bits over the range of ids), "sort" (parallel radix sort and dedupe), "hash" (private hash sets merged), or "auto" to choose with `choose_unique_strategy`.
+
+    Returns:
+        npt.NDArray|tuple: Unique ids, followed by inverse and counts if requested.
     """
+    assert strategy in (
+        "auto",
+        "bitmap",
+        "sort",
+        "hash",
+    ), f"Unknown strategy `{strategy}`."
+    assert ids.dtype.kind in "iu", "Only integer ids are supported."
     if len(ids) == 0:
-        return ids
-
-    if upper_limit is not None:
-        N = upper_limit
+        unique = ids
+        inverse = np.empty(0, dtype=np.int64)
+        counts = np.empty(0, dtype=np.int64)
     else:
-        N = int(np.max(ids)) + 1
+        if upper_limit is not None:
+            if ids.min() < 0 or ids.max() >= upper_limit:
+                raise ValueError(
+                    f"Ids must lie in range(0, {upper_limit}), got ones in [{ids.min()}, {ids.max()}]."
+                )
+            min_id = 0
+            range_size = upper_limit
+        else:
+            min_id = ids.min()
+            range_size = int(ids.max()) - int(min_id) + 1
+        if strategy == "auto":
+            strategy = choose_unique_strategy(ids, range_size)
+        match strategy:
+            case "bitmap":
+                unique, inverse, counts = _unique_by_bitmap(
+                    ids, min_id, range_size, return_inverse, return_counts
+                )
+            case "sort":
+                unique, inverse, counts = _unique_by_sorting(
+                    ids, return_inverse, return_counts
+                )
+            case "hash":
+                unique, inverse, counts = _unique_by_hashing(
+                    ids, return_inverse, return_counts
+                )
 
-    return observe(
-        ids,
-        to_observe=np.full(fill_value=False, dtype=bool, shape=N),
-    )
+    if not return_inverse and not return_counts:
+        return unique
+    res = (unique,)
+    if return_inverse:
+        res += (inverse,)
+    if return_counts:
+        res += (counts,)
+    return res
 
 
 @inputs_series_to_numpy
@@ -41,3 +305,89 @@ def get_unique_sorted(sorted_ids: npt.NDArray):
             res.append(_id)
         prev = _id
     return np.array(res, dtype=sorted_ids.dtype)
+
+
+@numba.njit(parallel=True)
+def first_occurrences(
+    codes: npt.NDArray, codes_cnt: int, chunks_cnt: int
+) -> npt.NDArray:
+    """Get the first row of each code in `range(codes_cnt)` with private per chunk minima merged in the end."""
+    size = len(codes)
+    firsts = np.full((chunks_cnt, codes_cnt), size, dtype=np.int64)
+    for c in numba.prange(chunks_cnt):
+        for i in range(c * size // chunks_cnt, (c + 1) * size // chunks_cnt):
+            if firsts[c, codes[i]] == size:
+                firsts[c, codes[i]] = i
+    res = np.empty(codes_cnt, dtype=np.int64)
+    for k in numba.prange(codes_cnt):
+        res[k] = firsts[:, k].min()
+    return res
+
+
+def _get_dense_codes(columns: list[npt.NDArray]) -> tuple[npt.NDArray, int]:
+    """Get codes of rows of columns, dense and ordered as the rows lexicographically.
+
+    Columns are packed into one uint64 key if their significant bits fit, otherwise both halves of columns are coded separately and their codes are packed.
+    """
+    encoded = [encode_sort_key(col) for col in columns]
+    if sum(bits for _, bits in encoded) <= 64:
+        keys = encoded[0][0]
+        for col_keys, bits in encoded[1:]:
+            pack_keys(keys, col_keys, bits)
+        unique, codes = get_unique(keys, return_inverse=True)
+        return codes, len(unique)
+    assert len(columns) > 1, "Impossible: a single column has at most 64 bits."
+    half = len(columns) // 2
+    head_codes, _ = _get_dense_codes(columns[:half])
+    tail_codes, _ = _get_dense_codes(columns[half:])
+    return _get_dense_codes([head_codes, tail_codes])
+
+
+def factorize(
+    *columns: npt.NDArray | pd.Series,
+    sort: bool = True,
+    return_index: bool = False,
+) -> tuple:
+    """Map rows of key columns onto dense codes 0..K-1, in parallel.
+
+    Arguments:
+        *columns (npt.NDArray|pd.Series): Integer (or float) key columns of the same length.
+        sort (bool): Order codes as the unique keys lexicographically. Otherwise, in the order of their first appearance, like `pd.factorize`.
+        return_index (bool): Also return a `LexicographicIndex` of the groups of equal keys. Requires rows sorted by keys.
+
+    Returns:
+        tuple: Codes, a tuple of unique key columns (the keys of codes 0..K-1), and the index if requested.
+    """
+    columns = [cast_to_array_if_possible(col) for col in columns]
+    assert len(columns) > 0, "Provide at least one column."
+    for col in columns:
+        assert len(col) == len(columns[0]), "Columns have different lengths."
+    if len(columns[0]) == 0:
+        codes = np.empty(0, dtype=np.int64)
+        firsts = codes
+    else:
+        codes, codes_cnt = _get_dense_codes(columns)
+        firsts = first_occurrences(
+            codes, codes_cnt, _get_chunks_cnt(len(codes), codes_cnt)
+        )
+        if not sort:
+            order = np.argsort(firsts)
+            new_codes = np.empty(codes_cnt, dtype=np.int64)
+            new_codes[order] = np.arange(codes_cnt)
+            codes = take(new_codes, codes, np.empty_like(codes))
+            firsts = firsts[order]
+    unique_columns = tuple(
+        take(col, firsts, np.empty(len(firsts), dtype=col.dtype)) for col in columns
+    )
+    if not return_index:
+        return codes, unique_columns
+    assert is_nondecreasing(
+        codes
+    ), "Rows are not sorted by keys: cannot build a LexicographicIndex."
+    return (
+        codes,
+        unique_columns,
+        LexicographicIndex.from_idx(
+            np.append(firsts, len(codes)).astype(get_index_dtype(len(codes)))
+        ),
+    )
@@ -1,11 +1,46 @@
 import itertools
+import json
+import pickle
 
 import pytest
 
+import h5py
 import numba
 import numpy as np
 import pandas as pd
-from pandas_ops.lex_ops import LexicographicIndex
+import pyarrow.parquet
+from numba import literal_unroll
+from numba_progress import ProgressBar
+from pandas_ops import io
+from pandas_ops.lex_ops import (
+    LexicographicIndex,
+    iter_streamed_lex_index,
+    get_columns_fingerprint,
+    open_index,
+    read_index_meta,
+    write_index,
+)
+from pandas_ops.parsers.misc import parse_key_equal_value
+from pandas_ops.sortedness import (
+    find_all_indices_that_break_lexicographic_sortedness,
+    find_breakers_in_batches,
+    is_sorted_lexicographically,
+    lex_argsort,
+    sort_df_lexicographically,
+)
+from pandas_ops.filters import BoxFilter, quantile_filter_query
+from pandas_ops.iteration import iter_df_batches
+from pandas_ops.stats import (
+    KLLSketch,
+    count1D,
+    count2D,
+    countND,
+    sketch_columns,
+    weighted_covariance,
+    weighted_mean_and_var,
+    weighted_moments,
+)
+from pandas_ops.uniqueness import factorize, get_unique
 
 
 @numba.njit
@@ -94,3 +129,784 @@ def test_mapping_function_with_nd_array_values():
 
 
 # TODO: test writing of data in RAM or something??
+
+
+def test_index_two_pass_construction_matches_mask_based_one():
+    rng = np.random.default_rng(42)
+    a = np.sort(rng.integers(0, 20, size=10_000))
+    b = rng.integers(0, 3, size=len(a)).astype(np.float32)
+    b = b[np.lexsort((b, a))]
+    expected = np.flatnonzero(np.r_[True, (a[1:] != a[:-1]) | (b[1:] != b[:-1])])
+    expected = np.r_[expected, len(a)]
+    for chunks_cnt in (1, 3, 64, len(a)):
+        lexidx = LexicographicIndex(a, b, chunks_cnt=chunks_cnt)
+        assert lexidx.idx.dtype == np.uint32
+        np.testing.assert_array_equal(lexidx.idx, expected)
+
+
+def test_index_progress_counts_rows_and_columns():
+    a = np.repeat(np.arange(100), 10)
+    for chunks_cnt in (1, 7, len(a)):
+        with ProgressBar(total=2 * (len(a) - 1), disable=True) as progress_proxy:
+            LexicographicIndex(
+                a, a, progress_proxy=progress_proxy, chunks_cnt=chunks_cnt
+            )
+            assert progress_proxy.n == 2 * (len(a) - 1)
+
+
+def test_index_respects_memory_budget():
+    with pytest.raises(MemoryError):
+        LexicographicIndex(np.arange(1000), memory_budget=100)
+
+
+def test_streamed_index_matches_in_memory_one(tmp_path):
+    rng = np.random.default_rng(0)
+    a = np.sort(rng.integers(0, 50, size=5_000))
+    b = np.zeros(len(a), dtype=np.float32)
+    expected = LexicographicIndex(a, b).idx
+    for chunk_rows in (1, 7, 100, len(a)):
+        parts = iter_streamed_lex_index(a, b, chunk_rows=chunk_rows)
+        np.testing.assert_array_equal(np.concatenate(list(parts)), expected)
+
+    write_index(tmp_path / "idx", iter_streamed_lex_index(a, b, chunk_rows=333))
+    stored = LexicographicIndex.from_idx(open_index(tmp_path / "idx"))
+    assert stored.idx.dtype == expected.dtype
+    np.testing.assert_array_equal(stored.idx, expected)
+
+
+def test_index_save_load_roundtrip(tmp_path):
+    test = TestLexicographicIndex()
+    columns = {"a": test.X.a.to_numpy(), "b": test.X.b.to_numpy()}
+    fingerprint = get_columns_fingerprint(columns)
+    test.lexidx.save(tmp_path / "idx", fingerprint=fingerprint)
+    for mmap in (True, False):
+        loaded = LexicographicIndex.load(tmp_path / "idx", mmap=mmap)
+        np.testing.assert_array_equal(loaded.idx, test.lexidx.idx)
+    assert read_index_meta(tmp_path / "idx")["fingerprint"] == fingerprint
+    columns["b"] = columns["b"][::-1].copy()
+    assert get_columns_fingerprint(columns) != fingerprint
+
+
+def test_get_or_build_reuses_fresh_sidecars(tmp_path):
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({"a": np.sort(rng.integers(0, 50, size=1_000))})
+    dataset = tmp_path / "df.parquet"
+    df.to_parquet(dataset)
+    index_path = tmp_path / "idx"
+    expected = LexicographicIndex(df.a.to_numpy()).idx
+
+    built = LexicographicIndex.get_or_build(dataset, ["a"], index_path=index_path)
+    np.testing.assert_array_equal(built.idx, expected)
+    fingerprint = read_index_meta(index_path)["fingerprint"]
+    marker = np.array([0, len(df)], dtype=expected.dtype)
+    write_index(index_path, [marker], fingerprint)
+    cached = LexicographicIndex.get_or_build(dataset, ["a"], index_path=index_path)
+    np.testing.assert_array_equal(cached.idx, marker)
+
+    df = pd.concat([df, pd.DataFrame({"a": [50, 50, 51]})], ignore_index=True)
+    df.to_parquet(dataset)
+    expected = LexicographicIndex(df.a.to_numpy()).idx
+    rebuilt = LexicographicIndex.get_or_build(dataset, ["a"], index_path=index_path)
+    np.testing.assert_array_equal(rebuilt.idx, expected)
+
+    for legacy in ("without_key", "saved"):
+        if legacy == "saved":
+            LexicographicIndex.from_idx(marker).save(index_path)
+        else:
+            write_index(index_path, [marker])
+            meta = read_index_meta(index_path)
+            del meta["fingerprint"]
+            (index_path / "meta.json").write_text(json.dumps(meta))
+        rebuilt = LexicographicIndex.get_or_build(dataset, ["a"], index_path=index_path)
+        np.testing.assert_array_equal(rebuilt.idx, expected)
+        assert read_index_meta(index_path)["fingerprint"] is not None
+
+
+def test_aggregate_matches_pandas_groupby():
+    rng = np.random.default_rng(1)
+    keys = np.sort(rng.integers(0, 100, size=10_000))
+    xx = rng.integers(-1000, 1000, size=len(keys)).astype(np.int32)
+    ww = rng.random(len(keys))
+    lexidx = LexicographicIndex(keys)
+    res = lexidx.aggregate(xx, weights=ww)
+
+    df = pd.DataFrame({"key": keys, "x": xx, "w": ww})
+    grouped = df.groupby("key").x
+    np.testing.assert_array_equal(res["sum"], grouped.sum())
+    np.testing.assert_array_equal(res["min"], grouped.min())
+    np.testing.assert_array_equal(res["max"], grouped.max())
+    np.testing.assert_array_equal(res["argmax"], grouped.idxmax())
+    np.testing.assert_array_equal(res["count"], grouped.size())
+    np.testing.assert_array_equal(res["first"], grouped.first())
+    np.testing.assert_array_equal(res["last"], grouped.last())
+    expected_mean_var = np.array(
+        [
+            weighted_mean_and_var(d.x.to_numpy(), d.w.to_numpy())
+            for _, d in df.groupby("key")
+        ]
+    )
+    np.testing.assert_allclose(res["mean"], expected_mean_var[:, 0])
+    np.testing.assert_allclose(res["var"], expected_mean_var[:, 1])
+
+    res = lexidx.aggregate({"x": xx}, ops=["count", "max"], as_df=False)
+    assert list(res) == ["count", "x_max"]
+
+
+@pytest.mark.parametrize("heaviest_first", [False, True])
+def test_balanced_schedule_matches_static_one(heaviest_first):
+    rng = np.random.default_rng(2)
+    sizes = np.minimum(rng.zipf(1.5, size=500), 10_000)
+    keys = np.repeat(np.arange(len(sizes)), sizes)
+    values = rng.random(len(keys))
+    lexidx = LexicographicIndex(keys)
+    static = lexidx.map(sum_all, values, values)
+    balanced = lexidx.map(
+        sum_all,
+        values,
+        values,
+        schedule="balanced",
+        heaviest_first=heaviest_first,
+        chunks_cnt=7,
+    )
+    np.testing.assert_array_equal(static, balanced)
+
+
+@numba.njit
+def above_mean(xx, *args):
+    return xx[xx > np.mean(xx)]
+
+
+@numba.njit
+def count_above_mean(xx, *args):
+    return np.sum(xx > np.mean(xx))
+
+
+def test_map_ragged():
+    rng = np.random.default_rng(3)
+    keys = np.sort(rng.integers(0, 100, size=5_000))
+    values = rng.random(len(keys))
+    lexidx = LexicographicIndex(keys)
+    expected = [
+        above_mean(values[s:e]) for s, e in zip(lexidx.idx[:-1], lexidx.idx[1:])
+    ]
+    for counter in (None, count_above_mean):
+        flat, offsets = lexidx.map_ragged(above_mean, values, counter=counter)
+        assert len(offsets) == len(lexidx) + 1
+        for i, exp in enumerate(expected):
+            np.testing.assert_array_equal(flat[offsets[i] : offsets[i + 1]], exp)
+    assert len(LexicographicIndex.from_idx(offsets)) == len(lexidx)
+
+
+@numba.njit
+def sum_of_medians(*columns):
+    res = 0.0
+    for col in literal_unroll(columns):
+        res += np.median(np.sort(col))
+    return res
+
+
+def test_map_accepts_any_number_of_columns():
+    test = TestLexicographicIndex()
+    columns = [test.X.c.to_numpy() + i for i in range(9)]
+    res = test.lexidx.map(sum_of_medians, *columns)
+    expected = [
+        sum(np.median(d.c.to_numpy() + i) for i in range(9))
+        for _, d in test.X.groupby(["a", "b"])
+    ]
+    np.testing.assert_allclose(res, expected)
+    outputs = np.empty(len(test.lexidx), dtype=np.float64)
+    test.lexidx.simple_parallel_map(outputs, sum_of_medians, None, 1, *columns)
+    np.testing.assert_allclose(outputs, expected)
+
+
+def test_parallel_lexicographic_sortedness_check():
+    rng = np.random.default_rng(4)
+    a = np.sort(rng.integers(0, 1000, size=300_000))
+    b = rng.integers(0, 5, size=len(a)).astype(np.float32)
+    order = np.lexsort((b, a))
+    a, b = a[order], b[order]
+    assert is_sorted_lexicographically(a, b)
+    assert not is_sorted_lexicographically(a, b, strictly=True)
+    assert is_sorted_lexicographically(np.arange(len(a)), b, strictly=True)
+    for row in (1, 65_536, len(a) - 1):
+        swapped = np.arange(len(a))
+        swapped[[row - 1, row]] = row, row - 1
+        assert not is_sorted_lexicographically(swapped, b)
+    assert is_sorted_lexicographically(np.array([1]), np.array([2.0]), strictly=True)
+
+
+def test_lex_argsort_matches_numpy_lexsort():
+    rng = np.random.default_rng(5)
+    a = rng.integers(-5, 5, size=100_000)
+    b = rng.normal(size=len(a)).round(1)
+    b[::7] = np.nan
+    c = rng.integers(0, 2**62, size=len(a))
+    for columns in ((a,), (b,), (a, b), (a, b, c), (b.astype(np.float32), a)):
+        np.testing.assert_array_equal(lex_argsort(*columns), np.lexsort(columns[::-1]))
+
+    df = pd.DataFrame(
+        {
+            "a": a,
+            "b": b,
+            "s": a.astype(str),
+            "cat": pd.Categorical(a.astype(str)),
+            "nullable": pd.array(np.where(a > 0, a, None), dtype="Int64"),
+        }
+    )
+    res = sort_df_lexicographically(df, by=["s", "b"])
+    pd.testing.assert_frame_equal(
+        res, df.sort_values(["s", "b"], kind="stable").reset_index(drop=True)
+    )
+    assert res.cat.dtype == df.cat.dtype and res.nullable.dtype == "Int64"
+
+
+def test_find_breakers_in_batches():
+    a = np.array([1, 2, 2, 1, 5, 6])
+    b = np.array([0.0, 1.0, 1.0, 3.0, 0.0, 0.0])
+    batches = [(a[:2], b[:2]), (a[2:3], b[2:3]), (a[3:], b[3:])]
+    assert find_breakers_in_batches(batches, strictly=True) == [2]
+    assert find_breakers_in_batches(batches) == [3]
+    assert find_breakers_in_batches(batches[:2]) == []
+    assert find_all_indices_that_break_lexicographic_sortedness(True, a, b) == [2, 3]
+
+
+@pytest.mark.parametrize("strategy", ["auto", "bitmap", "sort", "hash"])
+def test_get_unique_matches_numpy_unique(strategy):
+    rng = np.random.default_rng(6)
+    for ids in (
+        rng.integers(0, 100, size=10_000),
+        rng.integers(-50, 50, size=10_000).astype(np.int16),
+        rng.integers(0, 2**62, size=100)[rng.integers(0, 100, size=10_000)],
+        np.array([2**63 + 5, 2**63 + 1, 2**63 + 5], dtype=np.uint64),
+    ):
+        if strategy == "bitmap" and int(ids.max()) - int(ids.min()) > 1e8:
+            continue
+        unique, inverse, counts = get_unique(
+            ids, return_inverse=True, return_counts=True, strategy=strategy
+        )
+        expected = np.unique(ids, return_inverse=True, return_counts=True)
+        assert unique.dtype == ids.dtype
+        for res, exp in zip((unique, inverse, counts), expected):
+            np.testing.assert_array_equal(res, exp)
+        np.testing.assert_array_equal(get_unique(ids, strategy=strategy), unique)
+
+
+def test_get_unique_checks_upper_limit():
+    np.testing.assert_array_equal(
+        get_unique(np.array([7, 0, 5, 7]), upper_limit=10), [0, 5, 7]
+    )
+    for ids in (np.array([-3, 5, 7]), np.array([0, 5, 100_000])):
+        with pytest.raises(ValueError):
+            get_unique(ids, upper_limit=10)
+
+
+def test_factorize_matches_pandas():
+    rng = np.random.default_rng(7)
+    a = rng.integers(-3, 3, size=10_000)
+    b = rng.integers(0, 2**62, size=20)[rng.integers(0, 20, size=len(a))]
+    c = rng.integers(0, 2**40, size=10)[rng.integers(0, 10, size=len(a))]
+    for sort in (True, False):
+        codes, (ua, ub, uc) = factorize(a, b, c, sort=sort)
+        expected_codes, expected = pd.MultiIndex.from_arrays([a, b, c]).factorize(
+            sort=sort
+        )
+        np.testing.assert_array_equal(codes, expected_codes)
+        for res, level in zip((ua, ub, uc), range(3)):
+            np.testing.assert_array_equal(res, expected.get_level_values(level))
+
+    order = np.lexsort((b, a))
+    codes, (ua, ub), index = factorize(a[order], b[order], return_index=True)
+    np.testing.assert_array_equal(np.diff(index.idx), np.bincount(codes))
+    np.testing.assert_array_equal(a[order][index.idx[:-1]], ua)
+    with pytest.raises(AssertionError):
+        factorize(a, return_index=True)
+
+
+def test_counts_are_offset_by_minima():
+    rng = np.random.default_rng(8)
+    xx = rng.integers(-5, 100, size=10_000)
+    yy = rng.integers(10, 20, size=len(xx))
+    for x in (xx, xx * 1000):  # private histograms and a single one
+        cnts, min_x, max_x = count1D(x)
+        assert (min_x, max_x) == (x.min(), x.max())
+        np.testing.assert_array_equal(cnts, np.bincount(x - min_x))
+
+        cnts, min_x, max_x, min_y, max_y = count2D(x, yy)
+        expected = np.zeros((max_x - min_x + 1, max_y - min_y + 1), dtype=np.uint64)
+        np.add.at(expected, (x - min_x, yy - min_y), 1)
+        np.testing.assert_array_equal(cnts, expected)
+
+
+def test_counts_of_too_wide_ranges_need_countND():
+    xx = np.array([-(2**60), 5, 5, 2**60])
+    yy = np.array([3, 1, 1, 2**40])
+    with pytest.raises(AssertionError):
+        count1D(xx)
+    with pytest.raises(AssertionError):
+        count2D(xx, yy)
+    with pytest.raises(AssertionError):
+        count2D(np.array([0, 10]), np.array([0, 10]), max_dense_size=100)
+    counts = countND(xx)
+    assert counts[0].tolist() == [-(2**60), 5, 2**60]
+    assert counts["count"].tolist() == [1, 2, 1]
+    counts = countND(xx, yy)
+    assert counts[1].tolist() == [3, 1, 2**40]
+    assert counts["count"].tolist() == [1, 2, 1]
+
+
+def test_counts_are_callable_from_numba():
+    @numba.njit
+    def count_both(xx, yy):
+        return count1D(xx)[0].sum() + count2D(xx, yy)[0].sum()
+
+    xx = np.array([3, 1, 3, 2])
+    assert count_both(xx, xx) == 2 * len(xx)
+
+
+def test_countND_matches_groupby():
+    rng = np.random.default_rng(9)
+    df = pd.DataFrame(
+        {
+            "charge": rng.integers(1, 5, size=10_000),
+            "scan": rng.integers(0, 1000, size=10_000),
+            "frame": rng.integers(0, 2**62, size=20)[rng.integers(0, 20, size=10_000)],
+            "mz": rng.integers(0, 5, size=10_000) / 4,
+        }
+    )
+    for by in (["charge", "scan"], ["charge", "scan", "frame"], ["mz", "charge"]):
+        expected = df.groupby(by).size().rename("count").astype(np.uint64)
+        pd.testing.assert_frame_equal(
+            countND(*(df[col] for col in by)), expected.reset_index()
+        )
+    assert list(countND(df.charge.to_numpy(), df.scan.to_numpy()).columns) == [
+        0,
+        1,
+        "count",
+    ]
+
+
+def test_kll_sketch_merges_within_rank_error():
+    rng = np.random.default_rng(10)
+    xx = rng.lognormal(size=400_000)
+    sketch = KLLSketch(seed=0).update(xx[:100_000])
+    other = KLLSketch(seed=1)
+    for start in range(100_000, len(xx), 10_000):
+        other.update(xx[start : start + 10_000])
+    sketch.merge(pickle.loads(pickle.dumps(other)))
+    assert sketch.n == len(xx)
+
+    qs = np.linspace(0, 1, 51)
+    ranks = np.searchsorted(np.sort(xx), sketch.quantile(qs)) / len(xx)
+    assert np.abs(ranks - qs).max() <= 2 * sketch.rank_error
+    assert sketch.quantile(0) == xx.min() and sketch.quantile(1) == xx.max()
+
+    df = pd.DataFrame({"a": xx, "b": rng.permutation(xx)})
+    sketches = sketch_columns(iter_df_batches(df, size=50_000), seed=0)
+    query = quantile_filter_query(sketches, 0.05, 0.95)
+    assert abs(len(df.query(query)) / len(df) - 0.81) < 4 * sketch.rank_error
+
+
+def test_box_filter_matches_query(tmp_path):
+    rng = np.random.default_rng(11)
+    df = pd.DataFrame(
+        {
+            "a": rng.normal(size=10_000),
+            "b": rng.integers(0, 100, size=10_000),
+            "c": rng.normal(size=10_000),
+        }
+    )
+    df.loc[5, "a"] = np.nan
+    box = BoxFilter.from_quantiles(df[["a", "b"]], 0.05, 0.9)
+    assert str(box) == quantile_filter_query(df[["a", "b"]], 0.05, 0.9)
+    expected = df.query(str(box))
+    pd.testing.assert_frame_equal(box.apply(df), expected)
+
+    df.to_parquet(tmp_path / "df.parquet")
+    pushed_down = pd.read_parquet(
+        tmp_path / "df.parquet", filters=box.to_pyarrow_expression()
+    )
+    pd.testing.assert_frame_equal(pushed_down, expected.reset_index(drop=True))
+
+    half_open = BoxFilter(lo={"a": 0.0}, hi={"b": 10})
+    assert half_open.to_duckdb_where() == '"a" >= 0.0 AND "b" <= 10'
+    np.testing.assert_array_equal(
+        half_open.get_mask({col: df[col].to_numpy() for col in df}),
+        ((df.a >= 0) & (df.b <= 10)).to_numpy(),
+    )
+
+
+def test_group_moments_match_two_pass_formulas():
+    rng = np.random.default_rng(12)
+    keys = np.sort(rng.integers(0, 50, size=5_000))
+    xx = rng.lognormal(size=len(keys))
+    yy = 2 * xx + rng.normal(size=len(keys))
+    ww = rng.random(len(keys))
+    res = LexicographicIndex(keys).moments(xx, ww, higher=True, covariate=yy)
+
+    for g, (_, d) in enumerate(
+        pd.DataFrame({"k": keys, "x": xx, "y": yy, "w": ww}).groupby("k")
+    ):
+        w = d.w.to_numpy() / d.w.sum()
+        mean = np.sum(w * d.x)
+        dx = d.x.to_numpy() - mean
+        var = np.sum(w * dx**2)
+        expected = (
+            mean,
+            var,
+            np.sum(w * dx**3) / var**1.5,
+            np.sum(w * dx**4) / var**2 - 3,
+        )
+        np.testing.assert_allclose(
+            weighted_moments(d.x.to_numpy(), d.w.to_numpy()), expected
+        )
+        np.testing.assert_allclose(
+            res.loc[g, ["mean", "var", "skew", "kurtosis"]].to_numpy(dtype=float),
+            expected,
+        )
+        cov = np.sum(w * dx * (d.y - np.sum(w * d.y)))
+        np.testing.assert_allclose(
+            weighted_covariance(d.x.to_numpy(), d.y.to_numpy(), d.w.to_numpy()), cov
+        )
+        np.testing.assert_allclose(res["cov"][g], cov)
+    np.testing.assert_allclose(res.weight.sum(), ww.sum())
+    assert list(LexicographicIndex(keys).moments(xx).columns) == [
+        "weight",
+        "mean",
+        "var",
+    ]
+
+
+@pytest.mark.parametrize("extension", ["parquet", "feather", "csv", "hdf"])
+def test_read_df_projects_filters_and_slices(tmp_path, extension):
+    rng = np.random.default_rng(13)
+    df = pd.DataFrame(
+        {
+            "a": np.arange(1000),
+            "b": rng.normal(size=1000),
+            "c": rng.integers(0, 5, size=1000),
+        }
+    )
+    path = tmp_path / f"df.{extension}"
+    args = ()
+    if extension == "hdf":
+        args = ("data",)
+        with h5py.File(path, "w") as f:
+            for col in df:
+                f[f"data/{col}"] = df[col].to_numpy()
+    else:
+        io.save_df(df, path)
+
+    window = df.iloc[100:700]
+    expected = window[(window.c == 2) | (window.b > 1)][["b", "a"]]
+    res = io.read_df(
+        path,
+        *args,
+        columns=["b", "a"],
+        filters=[[("c", "==", 2)], [("b", ">", 1)]],
+        row_range=(100, 700),
+    )
+    pd.testing.assert_frame_equal(res, expected.reset_index(drop=True))
+
+    box = BoxFilter(lo={"c": 1}, hi={"c": 2})
+    res = io.read_df(path, *args, columns=["a"], filters=box)
+    pd.testing.assert_frame_equal(res, box.apply(df)[["a"]].reset_index(drop=True))
+    assert len(io.read_df(path, *args, row_range=(990, 2000))) == 10
+    with pytest.raises((io.MissingColumn, AssertionError, ValueError)):
+        io.read_df(path, *args, columns=["missing"])
+
+
+@pytest.mark.parametrize("extension", ["parquet", "feather", "csv"])
+@pytest.mark.parametrize("dtype_backend", ["pyarrow", "numpy_nullable"])
+def test_read_df_passes_reader_kwargs(tmp_path, extension, dtype_backend):
+    df = pd.DataFrame({"a": np.arange(10), "b": np.arange(10) / 2})
+    path = tmp_path / f"df.{extension}"
+    io.save_df(df, path)
+    expected_a = {"pyarrow": "int64[pyarrow]", "numpy_nullable": "Int64"}[dtype_backend]
+    for kwargs in ({}, {"row_range": (2, 5)}, {"filters": [("a", ">", 3)]}):
+        res = io.read_df(path, columns=["a"], dtype_backend=dtype_backend, **kwargs)
+        assert str(res.a.dtype) == expected_a
+
+
+@pytest.mark.parametrize("extension", ["parquet", "feather", "csv", "tsv", "hdf"])
+def test_iter_df_yields_bounded_batches(tmp_path, extension):
+    df = pd.DataFrame({"a": np.arange(1000), "b": np.arange(1000) % 7})
+    path = tmp_path / f"df.{extension}"
+    kwargs = {}
+    if extension == "hdf":
+        kwargs["group"] = "data"
+        with h5py.File(path, "w") as f:
+            for col in df:
+                f[f"data/{col}"] = df[col].to_numpy()
+    else:
+        io.save_df(df, path)
+
+    batches = list(io.iter_df(path, columns=["b", "a"], batch_rows=300, **kwargs))
+    assert [len(batch) for batch in batches] == [300, 300, 300, 100]
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), df[["b", "a"]])
+
+
+@pytest.mark.parametrize("extension", ["parquet", "feather", "csv", "hdf", "startrek"])
+def test_df_writer_streams_chunks(tmp_path, extension):
+    if extension == "startrek":
+        pytest.importorskip("mmappet")
+    df = pd.DataFrame({"a": np.arange(1000), "b": np.arange(1000) / 4})
+    path = tmp_path / f"df.{extension}"
+    with io.DfWriter(path, row_group_rows=256) as writer:
+        for start in range(0, len(df), 70):
+            writer.append(df.iloc[start : start + 70])
+    assert writer.rows == len(df)
+    args = ("/",) if extension == "hdf" else ()
+    pd.testing.assert_frame_equal(io.read_df(path, *args).copy(), df)
+    if extension == "parquet":
+        metadata = pyarrow.parquet.ParquetFile(path).metadata
+        row_groups = [metadata.row_group(i) for i in range(metadata.num_row_groups)]
+        assert [group.num_rows for group in row_groups] == [256, 256, 256, 232]
+    if extension == "feather":
+        batches = io.iter_df(path, batch_rows=1000)
+        assert [len(batch) for batch in batches] == [256, 256, 256, 232]
+
+    with io.DfWriter(tmp_path / "empty.parquet", schema={"a": np.int64}):
+        pass
+    assert io.read_df(tmp_path / "empty.parquet").dtypes.to_dict() == {
+        "a": np.dtype(np.int64)
+    }
+
+
+def test_df_writer_writes_strings_into_hdf(tmp_path):
+    df = pd.DataFrame(
+        {
+            "a": pd.array([1, 2, 3], dtype="Int64"),
+            "b": pd.Series(["x", "yy", "x"], dtype="string"),
+            "c": pd.Categorical(["u", "v", "u"]),
+        }
+    )
+    with io.DfWriter(tmp_path / "df.hdf", row_group_rows=2) as writer:
+        writer.append(df.iloc[:2])
+        writer.append(df.iloc[2:])
+    with h5py.File(tmp_path / "df.hdf") as f:
+        np.testing.assert_array_equal(f["a"][:], [1, 2, 3])
+        assert list(f["b"].asstr()[:]) == ["x", "yy", "x"]
+        assert list(f["c"].asstr()[:]) == ["u", "v", "u"]
+
+
+@pytest.mark.parametrize("extension", ["parquet", "feather", "csv", "hdf"])
+def test_df_writer_discards_output_on_error(tmp_path, extension):
+    path = tmp_path / f"df.{extension}"
+    with pytest.raises(RuntimeError):
+        with io.DfWriter(path) as writer:
+            writer.append(pd.DataFrame({"a": np.arange(10)}))
+            raise RuntimeError
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("extension", ["parquet", "feather", "hdf", "csv", "startrek"])
+def test_read_table_loads_columns_on_demand(tmp_path, extension):
+    if extension == "startrek":
+        pytest.importorskip("mmappet")
+    df = pd.DataFrame({"a": np.arange(100), "b": np.arange(100) / 4})
+    path = tmp_path / f"df.{extension}"
+    with io.DfWriter(path) as writer:
+        writer.append(df)
+
+    table = io.read_table(path)
+    assert table.columns == ["a", "b"]
+    assert len(table) == len(df)
+    assert table._df is None
+    assert table.dtypes.to_dict() == df.dtypes.to_dict()
+    pd.testing.assert_series_equal(table.b, df.b)
+    if extension != "csv":
+        assert list(table._cache) == ["b"]
+    pd.testing.assert_frame_equal(table.to_pandas(["b", "a"]).copy(), df[["b", "a"]])
+    with pytest.raises(io.MissingColumn):
+        table["c"]
+    pd.testing.assert_frame_equal(
+        table.query("a < 3").reset_index(drop=True), df.query("a < 3")
+    )
+    np.testing.assert_array_equal(table.eval("a + b"), df.eval("a + b"))
+    with pytest.raises(AttributeError):
+        table.no_such_attribute
+
+
+def test_count_rows_from_metadata(tmp_path):
+    df = pd.DataFrame({"a": np.arange(1000), "b": np.arange(1000) / 4})
+    for extension in ("parquet", "feather", "hdf", "csv", "tsv"):
+        with io.DfWriter(tmp_path / f"df.{extension}", row_group_rows=300) as writer:
+            writer.append(df)
+        assert io.count_rows(tmp_path / f"df.{extension}") == len(df)
+    (tmp_path / "no_trailing_newline.csv").write_text("a,b\n1,2\n3,4")
+    assert io.count_rows(tmp_path / "no_trailing_newline.csv") == 2
+    (tmp_path / "empty.csv").write_text("")
+    assert io.count_rows(tmp_path / "empty.csv") == 0
+
+
+def test_read_many_keeps_order_and_reports_failures(tmp_path):
+    paths = []
+    for i in range(10):
+        paths.append(tmp_path / f"df_{i}.parquet")
+        pd.DataFrame({"a": np.full(i, i), "b": np.arange(i)}).to_parquet(paths[-1])
+    paths.insert(3, tmp_path / "missing.parquet")
+
+    results = list(io.read_many(paths, columns=["a"], max_workers=3))
+    assert [path for path, _, _ in results] == paths
+    for path, df, error in results:
+        if path.name == "missing.parquet":
+            assert df is None and error is not None
+        else:
+            assert error is None and list(df.columns) == ["a"]
+            assert len(df) == int(path.stem.split("_")[1])
+
+    counts = io.read_many(paths, ordered=False, reader=io.count_rows)
+    assert sorted(count for _, count, _ in counts if count is not None) == list(
+        range(10)
+    )
+
+    consumed = []
+    results = io.read_many(
+        (consumed.append(path) or path for path in paths),
+        max_workers=2,
+        max_in_flight=2,
+    )
+    next(results)
+    assert len(consumed) <= 3
+    results.close()
+
+
+@pytest.mark.parametrize("output", [None, "out.parquet", "out.feather", "out.tsv"])
+def test_concat_tables(tmp_path, output):
+    dfs = [
+        pd.DataFrame({"a": np.arange(5, dtype=np.int32), "b": list("abcde")}),
+        pd.DataFrame({"a": np.arange(0, dtype=np.int32), "b": []}),
+        pd.DataFrame({"b": list("fg"), "a": [0.5, 1.5]}),
+    ]
+    paths = [tmp_path / "x.parquet", tmp_path / "y.parquet", tmp_path / "z.feather"]
+    for df, path in zip(dfs, paths):
+        io.save_df(df, path)
+    constants = [{"table_id": i, "name": path.name} for i, path in enumerate(paths)]
+
+    result = io.concat_tables(
+        paths,
+        output=None if output is None else tmp_path / output,
+        constants=constants,
+        max_workers=2,
+    )
+    if output is not None:
+        assert result is None
+        result = io.read_df(tmp_path / output)
+    if output != "out.tsv":
+        assert isinstance(result.name.dtype, pd.CategoricalDtype)
+        assert list(result.name.cat.categories) == [path.name for path in paths]
+    result = result.astype({"table_id": np.int64, "name": str})
+    expected = pd.concat(dfs, ignore_index=True)[["a", "b"]]
+    expected.insert(0, "table_id", [0] * 5 + [2] * 2)
+    expected.insert(1, "name", ["x.parquet"] * 5 + ["z.feather"] * 2)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert result.a.dtype == np.float64
+    plain = io.concat_tables(paths, constants=constants, categorical=False)
+    assert plain.table_id.dtype == np.int64
+    assert not io.stores_categoricals(tmp_path / "out.startrek")
+
+    dfs[0].to_csv(tmp_path / "x.csv", index=False)
+    table = io._open_table(tmp_path / "x.csv")
+    assert len(table) == 5 and table._df is None and table._cache == {}
+    pd.testing.assert_frame_equal(
+        io.concat_tables([tmp_path / "x.csv"] * 2),
+        pd.concat([dfs[0]] * 2, ignore_index=True),
+        check_dtype=False,
+    )
+
+    pd.DataFrame({"a": ["text"], "b": ["h"]}).to_parquet(tmp_path / "bad.parquet")
+    with pytest.raises(io.SchemaMismatch):
+        io.concat_tables([paths[0], tmp_path / "bad.parquet"])
+    pd.DataFrame({"a": [1]}).to_parquet(tmp_path / "narrow.parquet")
+    with pytest.raises(io.SchemaMismatch):
+        io.concat_tables([paths[0], tmp_path / "narrow.parquet"])
+    assert (
+        len(io.concat_tables([paths[0], tmp_path / "narrow.parquet"], columns=["a"]))
+        == 6
+    )
+
+
+def test_concat_tables_union_of_columns_skipping_unreadable(tmp_path):
+    dfs = [
+        pd.DataFrame({"a": [1, 2], "b": [True, False]}),
+        pd.DataFrame({"c": ["x"], "a": [3]}),
+    ]
+    paths = [tmp_path / "x.parquet", tmp_path / "missing.parquet", tmp_path / "y.csv"]
+    io.save_df(dfs[0], paths[0])
+    io.save_df(dfs[1], paths[2])
+    with pytest.raises(FileNotFoundError):
+        io.concat_tables(paths, columns="union")
+    with pytest.warns(UserWarning, match="missing.parquet"):
+        result = io.concat_tables(
+            paths,
+            columns="union",
+            errors="skip",
+            constants=[{"table_id": i} for i in range(3)],
+        )
+    expected = pd.concat(dfs, ignore_index=True)
+    expected.insert(0, "table_id", [0, 0, 2])
+    pd.testing.assert_frame_equal(
+        result.astype({"table_id": np.int64}), expected, check_dtype=False
+    )
+    assert result.a.dtype == np.int64 and result.b.dtype == object
+
+
+def test_concat_tables_promotes_datetime_units_and_categories(tmp_path):
+    dfs = [
+        pd.DataFrame(
+            {
+                "t": np.array(["2024-01-01", "2024-01-02"], dtype="M8[s]"),
+                "k": pd.Categorical(["a", "b"]),
+            }
+        ),
+        pd.DataFrame(
+            {
+                "t": np.array(["2024-01-03T00:00:00.001"], dtype="M8[ms]"),
+                "k": pd.Categorical(["c"]),
+            }
+        ),
+    ]
+    paths = [tmp_path / "x.feather", tmp_path / "y.feather"]
+    for df, path in zip(dfs, paths):
+        df.to_feather(path)
+    for output in (None, tmp_path / "out.parquet"):
+        result = io.concat_tables(paths, output=output)
+        if output is not None:
+            result = io.read_df(output)
+        assert result.t.dtype == np.dtype("M8[ms]")
+        assert list(result.k.cat.categories) == ["a", "b", "c"]
+        pd.testing.assert_frame_equal(
+            result.astype({"k": str}),
+            pd.concat(dfs, ignore_index=True).astype({"k": str, "t": "M8[ms]"}),
+        )
+
+
+def test_concat_tables_into_hive_partitions(tmp_path):
+    paths = []
+    for i in range(4):
+        paths.append(tmp_path / f"run_{i}.parquet")
+        pd.DataFrame({"a": np.arange(i + 1)}).to_parquet(paths[-1])
+    constants = [{"table_id": i, "run": f"r/{i % 2}"} for i in range(len(paths))]
+    output = tmp_path / "out.parquet"
+    io.concat_tables(paths, output=output, constants=constants, partition_cols=["run"])
+
+    assert sorted(p.name for p in output.iterdir()) == ["run=r%2F0", "run=r%2F1"]
+    part = pd.read_parquet(output / "run=r%2F1" / "part-3.parquet")
+    assert list(part.columns) == ["table_id", "a"]
+    result = pd.read_parquet(output).sort_values(["table_id", "a"])
+    assert result.run.astype(str).tolist() == [
+        f"r/{i % 2}" for i in range(len(paths)) for _ in range(i + 1)
+    ]
+    assert result.a.tolist() == [a for i in range(len(paths)) for a in range(i + 1)]
+
+
+def test_parse_key_equal_value():
+    assert parse_key_equal_value("batch_rows=1000") == ("batch_rows", 1000)
+    assert parse_key_equal_value("frac=0.5") == ("frac", 0.5)
+    assert parse_key_equal_value("columns=['a', 'b']") == ("columns", ["a", "b"])
+    assert parse_key_equal_value("strictly=True") == ("strictly", True)
+    assert parse_key_equal_value("path=/tmp/x.csv") == ("path", "/tmp/x.csv")
+    assert parse_key_equal_value("query=a==1") == ("query", "a==1")
+    assert parse_key_equal_value("id=007") == ("id", "007")
+    assert parse_key_equal_value("bad={[]}") == ("bad", "{[]}")
+    assert parse_key_equal_value("sep='1,2'") == ("sep", "1,2")